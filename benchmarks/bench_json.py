@@ -0,0 +1,93 @@
+"""Compare the default response path with FAST_JSON_RESPONSES on large lists.
+
+    python benchmarks/bench_json.py [--docs 10000] [--rounds 5]
+
+Both routes return the same assignment_list_helper documents; one goes
+through response_model validation and the stdlib encoder, the other
+through services.responses.respond in fast mode.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from models.Assignment import AssignmentListItem
+import services.responses as responses
+
+
+def make_documents(count: int) -> List[dict]:
+    now = datetime.utcnow()
+    return [
+        {
+            "id": str(ObjectId()),
+            "title": f"Assignment {i}",
+            "description": "Lorem ipsum dolor sit amet " * 8,
+            "subject": ["math", "biology", "history", "physics"][i % 4],
+            "files": [f"uploaded_files/{i % 256:02x}/{i:064x}"],
+            "file_names": [f"assignment-{i}.pdf"],
+            "created_by": f"user{i % 500:04d}",
+            "status": "pending",
+            "due_date": now + timedelta(days=i % 30),
+            "created_at": now,
+        }
+        for i in range(count)
+    ]
+
+
+def build_app(documents: List[dict]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/default", response_model=List[AssignmentListItem], response_model_exclude_unset=True)
+    async def default_mode():
+        return documents
+
+    @app.get("/fast", response_model=List[AssignmentListItem], response_model_exclude_unset=True)
+    async def fast_mode():
+        return responses.respond(documents, AssignmentListItem)
+
+    return app
+
+
+def measure(client: TestClient, path: str, rounds: int) -> List[float]:
+    client.get(path)  # Warm up
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        response = client.get(path)
+        timings.append(time.perf_counter() - started)
+        assert response.status_code == 200
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    responses.FAST_JSON_RESPONSES = True
+    client = TestClient(build_app(make_documents(args.docs)))
+
+    default_body = client.get("/default").json()
+    fast_body = client.get("/fast").json()
+    assert default_body == fast_body, "fast mode changed the response body"
+
+    print(f"{args.docs} documents, {args.rounds} rounds, encoder: {'orjson' if responses.orjson else 'json'}")
+    results = {}
+    for name in ("default", "fast"):
+        timings = measure(client, f"/{name}", args.rounds)
+        results[name] = statistics.median(timings)
+        print(f"  {name:8s} median {results[name] * 1000:8.1f} ms   min {min(timings) * 1000:8.1f} ms")
+    print(f"  speedup  {results['default'] / results['fast']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
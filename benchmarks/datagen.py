@@ -0,0 +1,126 @@
+"""Synthetic users, assignments, solutions and upload files.
+
+    python benchmarks/datagen.py --users 200 --assignments 2000 --out data.ndjson
+
+Everything is derived from --seed, so two runs at the same scale produce
+the same data. The load test imports this module to seed its stand-in;
+run it directly to dump NDJSON for a real database or bulk import.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+
+SUBJECTS = ["math", "biology", "history", "physics", "chemistry", "literature", "economics", "computer science"]
+STATUSES = ["pending", "in-progress", "completed"]
+ROLES = ["user"] * 8 + ["helper"] * 2  # one helper for every four students
+PASSWORD = "password1"
+WORDS = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore".split()
+
+
+@dataclass
+class Scale:
+    users: int = 200
+    assignments: int = 2000
+    solutions_per_assignment: int = 2
+    file_size: int = 64 * 1024  # bytes per generated upload file
+    files_per_upload: int = 2
+
+
+def text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def generate(scale: Scale, password_hash: str, seed: int = 1, now: datetime = None) -> Dict[str, List[dict]]:
+    rng = random.Random(seed)
+    now = now or datetime.utcnow()
+
+    users = [
+        {
+            "_id": ObjectId(),
+            "FullName": f"Bench User {i}",
+            "username": f"bench{i:05d}",
+            "email": f"bench{i:05d}@example.com",
+            "password": password_hash,
+            "role": "admin" if i == 0 else rng.choice(ROLES),
+            "gender": rng.choice(["female", "male"]),
+        }
+        for i in range(scale.users)
+    ]
+    students = [user["username"] for user in users if user["role"] == "user"] or [users[0]["username"]]
+    helpers = [user["username"] for user in users if user["role"] == "helper"] or [users[0]["username"]]
+
+    assignments = []
+    for i in range(scale.assignments):
+        created_at = now - timedelta(minutes=rng.randrange(60 * 24 * 60))
+        assignments.append({
+            "_id": ObjectId(),
+            "title": f"{text(rng, 3).title()} {i}",
+            "description": text(rng, 40),
+            "subject": rng.choice(SUBJECTS),
+            "files": [],
+            "file_names": [],
+            "created_by": rng.choice(students),
+            "status": rng.choice(STATUSES),
+            # Deadlines cluster in the next few days, like a real term
+            "due_date": now + timedelta(hours=rng.expovariate(1 / 72)) if rng.random() < 0.9 else None,
+            "created_at": created_at,
+            "version": 1,
+        })
+
+    solutions = [
+        {
+            "_id": ObjectId(),
+            "assignment_id": str(assignment["_id"]),
+            "answer_file": [],
+            "answer_file_names": [],
+            "answered_by": rng.choice(helpers),
+            "submitted_on": assignment["created_at"] + timedelta(hours=rng.randrange(1, 48)),
+            "version": 1,
+        }
+        for assignment in assignments
+        for _ in range(rng.randrange(scale.solutions_per_assignment * 2 + 1))
+    ]
+    return {"users": users, "assignments": assignments, "solutions": solutions}
+
+
+# Random (incompressible) bytes: content-addressed storage must not dedupe them
+def upload_files(scale: Scale, rng: random.Random) -> List[tuple]:
+    return [
+        ("files", (f"upload{rng.randrange(10 ** 9)}.pdf", rng.randbytes(scale.file_size), "application/pdf"))
+        for _ in range(scale.files_per_upload)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=Scale.users)
+    parser.add_argument("--assignments", type=int, default=Scale.assignments)
+    parser.add_argument("--solutions-per-assignment", type=int, default=Scale.solutions_per_assignment)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default="-", help="NDJSON file, one {collection, document} per line")
+    args = parser.parse_args()
+
+    from passlib.context import CryptContext
+    password_hash = CryptContext(schemes=["bcrypt"], deprecated="auto").hash(PASSWORD)
+    data = generate(Scale(args.users, args.assignments, args.solutions_per_assignment), password_hash, args.seed)
+
+    out = sys.stdout if args.out == "-" else open(args.out, "w")
+    for collection, documents in data.items():
+        for document in documents:
+            out.write(json.dumps({"collection": collection, "document": document}, default=str) + "\n")
+    if out is not sys.stdout:
+        out.close()
+        print(f"{sum(len(documents) for documents in data.values())} documents written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Cold-import budget for main:app.
+
+    python benchmarks/importtime.py [--ratio 1.95] [--budget-ms MS] [--runs 5] [--top 15]
+
+Imports ``main`` in fresh interpreters under ``python -X importtime`` and
+reports the median cumulative import time with the slowest modules by self
+time. The budget is relative to a bare ``import fastapi`` measured the same
+way on the same host (interleaved with the main runs), so it holds on slow
+and fast machines alike. Exits non-zero (for CI) when:
+
+    - the median exceeds --ratio (IMPORT_TIME_RATIO) times the baseline
+      median, or --budget-ms (IMPORT_TIME_BUDGET_MS) when that is given
+    - a module that should load on first use was imported (--lazy), e.g.
+      passlib or python-jose
+    - importing created files or directories in the working directory
+      (upload directories belong in the app lifespan)
+
+Nothing connects to Mongo: the client is created by the lifespan, which an
+import does not run.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# main costs ~1.77x a bare `import fastapi` (411 vs 232 ms on the reference
+# machine); the budget is that ratio plus a 10% margin. Re-measure and update
+# it when the startup cost changes on purpose.
+IMPORT_TIME_RATIO = float(os.getenv("IMPORT_TIME_RATIO", "1.95"))
+BASELINE_MODULE = "fastapi"
+# Fixed budget in ms instead of the ratio, for a known host
+IMPORT_TIME_BUDGET_MS = float(os.environ["IMPORT_TIME_BUDGET_MS"]) if os.getenv("IMPORT_TIME_BUDGET_MS") else None
+# Top-level packages that must not be imported by `import main`
+LAZY_MODULES = "passlib,jose,pstats"
+
+
+# One cold import; returns {module: (self_us, cumulative_us)} in import order
+def measure(module: str) -> dict:
+    with tempfile.TemporaryDirectory(prefix="assignaid-import-") as cwd:
+        code = f"import sys; sys.path.insert(0, {ROOT!r}); import {module}"
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=cwd,
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            sys.exit(f"importing {module} failed:\n{proc.stderr}")
+        created = sorted(os.listdir(cwd))
+
+    timings = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return {"timings": timings, "created": created}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--baseline", default=BASELINE_MODULE)
+    parser.add_argument("--ratio", type=float, default=IMPORT_TIME_RATIO)
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_TIME_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--lazy", default=LAZY_MODULES, help="comma-separated packages that must stay unimported")
+    args = parser.parse_args()
+
+    # The first run also compiles bytecode; it is not a cold *start*
+    measure(args.module)
+    measure(args.baseline)
+    # Interleaved, so a host that slows down mid-run affects both alike
+    runs, baseline_runs = [], []
+    for _ in range(max(1, args.runs)):
+        runs.append(measure(args.module))
+        baseline_runs.append(measure(args.baseline))
+
+    totals = [run["timings"][args.module][1] / 1000 for run in runs]
+    median = statistics.median(totals)
+    baseline = statistics.median(run["timings"][args.baseline][1] / 1000 for run in baseline_runs)
+    budget = args.budget_ms if args.budget_ms is not None else args.ratio * baseline
+    last = runs[-1]["timings"]
+
+    print(f"import {args.module}: median {median:.1f} ms over {len(runs)} runs "
+          f"(min {min(totals):.1f}, max {max(totals):.1f}), budget {budget:.0f} ms")
+    print(f"import {args.baseline}: median {baseline:.1f} ms, ratio {median / baseline:.2f}"
+          + (f" (limit {args.ratio:.2f})" if args.budget_ms is None else ""))
+    print(f"\n{'self ms':>9} {'cumul ms':>9}  module")
+    for name, (self_us, cumulative_us) in sorted(last.items(), key=lambda item: -item[1][0])[:args.top]:
+        print(f"{self_us / 1000:9.1f} {cumulative_us / 1000:9.1f}  {name}")
+
+    failures = []
+    if median > budget:
+        failures.append(f"median import time {median:.1f} ms is over the {budget:.0f} ms budget")
+    lazy = {name.strip() for name in args.lazy.split(",") if name.strip()}
+    eager = sorted({name.split(".")[0] for name in last} & lazy)
+    if eager:
+        failures.append(f"imported eagerly: {', '.join(eager)}")
+    created = runs[-1]["created"]
+    if created:
+        failures.append(f"import created {', '.join(created)} in the working directory")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
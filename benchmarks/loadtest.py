@@ -0,0 +1,302 @@
+"""Load test main:app against an in-process Mongo stand-in.
+
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/loadtest.py [--scenarios login,deadlines,uploads,lists]
+                                  [--users 200] [--assignments 2000]
+                                  [--concurrency 32] [--requests 500]
+                                  [--out run.json] [--baseline previous.json]
+
+Seeds synthetic data (benchmarks/datagen.py), boots the real app with its
+lifespan over httpx's ASGI transport and drives each scenario with
+--concurrency clients:
+
+    login      login burst: POST /login (bcrypt on the hashing pool)
+    deadlines  deadline-refresh storm: students re-polling due-soon lists
+               (If-Modified-Since) and hot assignments (If-None-Match)
+    uploads    assignment creation with files, plus NDJSON bulk imports
+    lists      cursor scans of assignments, solutions and users
+
+Prints p50/p95/p99 latency and throughput per route, and writes the same
+numbers as JSON to --out. --baseline compares p95 against an earlier run.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import standin
+import datagen
+
+SCENARIOS = ["login", "deadlines", "uploads", "lists"]
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    # Nearest rank on an already sorted list
+    index = max(0, min(len(ordered) - 1, math.ceil(q * len(ordered) / 100) - 1))
+    return ordered[index]
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.statuses: Dict[str, Dict[int, int]] = {}
+
+    async def request(self, client, route: str, method: str, url: str, ok=(200,), **kwargs):
+        started = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - started
+        self.samples.setdefault(route, []).append(elapsed)
+        statuses = self.statuses.setdefault(route, {})
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        if response.status_code not in ok:
+            self.errors[route] = self.errors.get(route, 0) + 1
+        return response
+
+    # Throughput is per route over the wall time of the whole scenario
+    def report(self, seconds: float) -> Dict[str, dict]:
+        routes = {}
+        for route, samples in sorted(self.samples.items()):
+            ordered = sorted(samples)
+            routes[route] = {
+                "count": len(ordered),
+                "errors": self.errors.get(route, 0),
+                "statuses": {str(status): n for status, n in sorted(self.statuses[route].items())},
+                "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+                "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+                "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+                "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+                "max_ms": round(ordered[-1] * 1000, 3),
+                "throughput_rps": round(len(ordered) / seconds, 1),
+            }
+        return routes
+
+
+class Bench:
+    def __init__(self, client, data: dict, args, rng: random.Random):
+        self.client = client
+        self.recorder = Recorder()
+        self.data = data
+        self.args = args
+        self.rng = rng
+        from routes.login import create_access_token
+        self.headers = {
+            user["username"]: {"Authorization": "Bearer " + create_access_token({"sub": user["username"], "role": user["role"]})}
+            for user in data["users"]
+        }
+        self.students = [user["username"] for user in data["users"] if user["role"] == "user"] or list(self.headers)
+        self.admin = data["users"][0]["username"]
+        self.hot = [str(a["_id"]) for a in sorted(data["assignments"], key=lambda a: a["due_date"] or datetime.max)[:20]]
+
+    async def run(self, name: str, count: int) -> dict:
+        operation = getattr(self, name)
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+
+        async def one(i):
+            async with semaphore:
+                await operation(i)
+
+        self.recorder = Recorder()
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(count)))
+        elapsed = time.perf_counter() - started
+        return {
+            "operations": count,
+            "seconds": round(elapsed, 3),
+            "operations_per_second": round(count / elapsed, 1),
+            "routes": self.recorder.report(elapsed),
+        }
+
+    async def login(self, i):
+        user = self.rng.choice(self.data["users"])
+        await self.recorder.request(
+            self.client, "POST /login", "POST", "/login",
+            data={"username": user["username"], "password": datagen.PASSWORD},
+        )
+
+    # Each student polls the due-soon list with the Last-Modified it saw, and
+    # re-fetches a hot assignment with the ETag it saw
+    async def deadlines(self, i):
+        headers = self.headers[self.rng.choice(self.students)]
+        now = datetime.utcnow()
+        if i % 2 == 0:
+            params = {"due_after": now.isoformat(), "due_before": (now + timedelta(hours=48)).isoformat(), "fields": "title,due_date,status"}
+            first = await self.recorder.request(self.client, "GET /assignments/", "GET", "/assignments/", headers=headers, params=params)
+            if "last-modified" in first.headers:
+                await self.recorder.request(
+                    self.client, "GET /assignments/ (conditional)", "GET", "/assignments/", ok=(200, 304),
+                    headers={**headers, "If-Modified-Since": first.headers["last-modified"]}, params=params,
+                )
+        else:
+            id = self.rng.choice(self.hot)
+            first = await self.recorder.request(self.client, "GET /assignments/{id}", "GET", f"/assignments/{id}", headers=headers)
+            if "etag" in first.headers:
+                await self.recorder.request(
+                    self.client, "GET /assignments/{id} (conditional)", "GET", f"/assignments/{id}", ok=(200, 304),
+                    headers={**headers, "If-None-Match": first.headers["etag"]},
+                )
+
+    async def uploads(self, i):
+        headers = self.headers[self.rng.choice(self.students)]
+        if i % 10 == 9:
+            rows = "".join(
+                json.dumps({"title": f"Imported {i}-{n}", "description": datagen.text(self.rng, 20), "subject": self.rng.choice(datagen.SUBJECTS)}) + "\n"
+                for n in range(self.args.bulk_rows)
+            )
+            await self.recorder.request(
+                self.client, "POST /assignments/bulk", "POST", "/assignments/bulk",
+                headers=self.headers[self.admin], files={"file": ("import.ndjson", rows.encode(), "application/x-ndjson")},
+            )
+        else:
+            await self.recorder.request(
+                self.client, "POST /assignments/", "POST", "/assignments/", headers=headers,
+                data={"title": f"Upload {i}", "description": datagen.text(self.rng, 20), "subject": self.rng.choice(datagen.SUBJECTS)},
+                files=datagen.upload_files(self.args.scale, self.rng),
+            )
+
+    async def lists(self, i):
+        headers = self.headers[self.admin]
+        kind = i % 3
+        if kind == 0:
+            cursor = None
+            for _ in range(self.args.pages):
+                params = {"limit": 50, **({"cursor": cursor} if cursor else {})}
+                response = await self.recorder.request(self.client, "GET /assignments/", "GET", "/assignments/", headers=headers, params=params)
+                cursor = response.headers.get("x-next-cursor")
+                if not cursor:
+                    break
+        elif kind == 1:
+            id = str(self.rng.choice(self.data["assignments"])["_id"])
+            await self.recorder.request(self.client, "GET /solutions/assignment/{id}", "GET", f"/solutions/assignment/{id}", headers=headers)
+        else:
+            await self.recorder.request(self.client, "GET /users/", "GET", "/users/", params={"role": "helper", "limit": 100})
+
+
+async def seed(data: dict):
+    import database
+    from services.conditional import touch
+    from services.repository import utcnow
+    await database.user_collection.insert_many(data["users"])
+    await database.assignment_collection.insert_many(data["assignments"])
+    if data["solutions"]:
+        await database.solution_collection.insert_many(data["solutions"])
+    # Give the list views a Last-Modified, as live writes would
+    touch(["users", "assignments"], utcnow())
+
+
+async def run(args) -> dict:
+    import httpx
+    import main
+    from services.passwords import password_hasher
+
+    rng = random.Random(args.seed)
+    data = datagen.generate(args.scale, await password_hasher.hash(datagen.PASSWORD), args.seed)
+
+    scenarios = {}
+    async with main.app.router.lifespan_context(main.app):
+        await seed(data)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            bench = Bench(client, data, args, rng)
+            for name in args.scenarios:
+                count = args.login_requests if name == "login" else args.requests
+                print(f"running {name} ({count} operations, concurrency {args.concurrency})", file=sys.stderr)
+                scenarios[name] = await bench.run(name, count)
+
+    return {
+        "meta": {
+            "started_at": args.started_at,
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "scale": vars(args.scale),
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+        },
+        "scenarios": scenarios,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_report(result: dict, baseline: Optional[dict]):
+    header = f"{'route':40s} {'count':>6s} {'err':>4s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'req/s':>8s}"
+    if baseline:
+        header += f" {'p95 vs base':>12s}"
+    for name, scenario in result["scenarios"].items():
+        print(f"\n{name}: {scenario['operations']} operations in {scenario['seconds']:.2f}s ({scenario['operations_per_second']:.1f}/s)")
+        print(header)
+        previous_routes = (baseline or {}).get("scenarios", {}).get(name, {}).get("routes", {})
+        for route, stats in scenario["routes"].items():
+            line = (
+                f"{route:40s} {stats['count']:6d} {stats['errors']:4d} {stats['p50_ms']:9.2f} "
+                f"{stats['p95_ms']:9.2f} {stats['p99_ms']:9.2f} {stats['throughput_rps']:8.1f}"
+            )
+            if baseline:
+                previous = previous_routes.get(route)
+                line += f" {stats['p95_ms'] / previous['p95_ms']:11.2f}x" if previous and previous["p95_ms"] else f" {'-':>12s}"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--users", type=int, default=datagen.Scale.users)
+    parser.add_argument("--assignments", type=int, default=datagen.Scale.assignments)
+    parser.add_argument("--solutions-per-assignment", type=int, default=datagen.Scale.solutions_per_assignment)
+    parser.add_argument("--file-size", type=int, default=datagen.Scale.file_size)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=500, help="operations per scenario")
+    parser.add_argument("--login-requests", type=int, default=100, help="operations in the login scenario")
+    parser.add_argument("--bulk-rows", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=5, help="pages per list scan")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--baseline", help="JSON report of an earlier run to compare with")
+    args = parser.parse_args()
+
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    args.scale = datagen.Scale(args.users, args.assignments, args.solutions_per_assignment, args.file_size)
+    args.started_at = datetime.utcnow().isoformat()
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    out = os.path.abspath(args.out) if args.out else None
+
+    # Uploaded files land in a scratch directory, not the checkout
+    scratch = tempfile.mkdtemp(prefix="assignaid-bench-")
+    os.chdir(scratch)
+    standin.install()
+
+    result = asyncio.run(run(args))
+    print_report(result, baseline)
+    if out:
+        with open(out, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"report written to {out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
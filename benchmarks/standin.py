@@ -0,0 +1,28 @@
+"""In-process Mongo stand-in for the benchmarks.
+
+Makes ``database.connect()`` build a mongomock-motor client instead of a
+Motor one, so ``main:app`` runs with no mongod. Call ``install()`` before
+the app's lifespan starts.
+
+mongomock implements the query language in Python, so absolute latencies
+are not production numbers. They are comparable between runs of the same
+harness, which is what the benchmarks are for.
+"""
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+
+def install():
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        sys.exit("The benchmarks need mongomock-motor: pip install -r benchmarks/requirements.txt")
+
+    database.create_client = AsyncMongoMockClient
+    # mongomock has no $unionWith, so counter reconciliation cannot run here
+    logging.getLogger("services.stats").setLevel(logging.CRITICAL)
@@ -1,20 +1,146 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
-from pymongo import MongoClient
+import asyncio
+import logging
 import os
+from services.instrumentation import command_metrics, pool_metrics
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables from .env file
 load_dotenv()
 
 MONGODB_URL = os.getenv("MONGODB_URL")
 
+# Connection pool and timeout settings (per worker process, so the
+# deployment opens up to workers * MONGO_MAX_POOL_SIZE connections)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "10"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000"))  # waiting for a free connection
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "")  # e.g. "zstd,snappy,zlib"; empty disables
+
+
+def client_options() -> dict:
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        "event_listeners": [command_metrics, pool_metrics],  # Times every command, tracks the pool
+    }
+    if MONGO_COMPRESSORS:
+        options["compressors"] = MONGO_COMPRESSORS
+    return options
+
+
+DATABASE_NAME = "mydb"
+
+
+# Stands in for the database or a collection until connect() creates this
+# process's client; from then on every attribute goes to the real object.
+# Modules can keep importing collections at import time, before any worker
+# has forked, without sharing a client (and its sockets) across processes.
+class Bound:
+    def __init__(self, name: str):
+        self.name = name
+        self._target = None
+
+    def __getattr__(self, attr):
+        target = self.__dict__.get("_target")
+        if target is None:
+            raise RuntimeError(f"MongoDB is not connected ({self.name}); database.connect() runs in the app lifespan")
+        return getattr(target, attr)
+
+
+database = Bound(DATABASE_NAME)
+assignment_collection = Bound("assignments")
+solution_collection = Bound("solutions")
+user_collection = Bound("users")
+blob_collection = Bound("blobs")
+change_collection = Bound("changes")
+upload_session_collection = Bound("upload_sessions")
+help_request_collection = Bound("help_requests")
+profile_collection = Bound("profiles")
+notification_collection = Bound("notifications")
+subscription_collection = Bound("subscriptions")
+lease_collection = Bound("leases")
+review_collection = Bound("reviews")
+rating_collection = Bound("ratings")
+stat_collection = Bound("stats")
+
+COLLECTIONS = [
+    assignment_collection, solution_collection, user_collection, blob_collection, change_collection,
+    upload_session_collection, help_request_collection, profile_collection, notification_collection,
+    subscription_collection, lease_collection, review_collection, rating_collection, stat_collection,
+]
+
+client = None
+_client_pid = None
+
+
+def create_client():
+    return AsyncIOMotorClient(MONGODB_URL, **client_options())
+
+
+# Set once the pool is warm, cleared on shutdown; read by /readyz
+connected = False
+
+
+async def ping(timeout: float = None):
+    if client is None:
+        raise RuntimeError("MongoDB is not connected")
+    ping_command = client.admin.command("ping")
+    if timeout is None:
+        return await ping_command
+    return await asyncio.wait_for(ping_command, timeout)
+
+
+# Run from the application lifespan, i.e. in each worker after it forked:
+# create this process's client, wait for a server, then open
+# MONGO_MIN_POOL_SIZE connections up front so the first requests after a
+# deploy don't pay for connection setup
+async def connect():
+    global client, _client_pid, connected
+    if client is None or _client_pid != os.getpid():
+        client = create_client()
+        _client_pid = os.getpid()
+        database._target = client.get_database(DATABASE_NAME)
+        for collection in COLLECTIONS:
+            collection._target = database._target.get_collection(collection.name)
+        pool_metrics.max_pool_size = MONGO_MAX_POOL_SIZE
+
+    await ping()
+    await asyncio.gather(*(ping() for _ in range(MONGO_MIN_POOL_SIZE)))
+    connected = True
+    logger.info("MongoDB ready in worker %s: %s", _client_pid, pool_metrics.metrics())
 
 
+# Close the client and detach the proxies from it, so use after shutdown
+# fails loudly instead of going to a closed client
+async def close():
+    global client, connected
+    connected = False
+    database._target = None
+    for collection in COLLECTIONS:
+        collection._target = None
+    if client is not None:
+        client.close()
+        client = None
 
 
-# Create the client connection to MongoDB Atlas
-client = AsyncIOMotorClient(MONGODB_URL)
-database = client.get_database("mydb")
-assignment_collection = database.get_collection("assignments")
-solution_collection = database.get_collection("solutions")
-user_collection = database.get_collection("users")
+# Run a coroutine function with this process's client, for command-line tools
+def run_with_client(function, *args, **kwargs):
+    async def main():
+        await connect()
+        try:
+            return await function(*args, **kwargs)
+        finally:
+            await close()
+    return asyncio.run(main())
@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import os
+import sys
+import time
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+from database import database, run_with_client
+from services.leases import Lease
+
+logger = logging.getLogger(__name__)
+
+# Set INDEX_RECONCILE=dry-run to only log the diff at startup, or "off" to skip it
+INDEX_RECONCILE = os.getenv("INDEX_RECONCILE", "apply")
+# Drop indexes that are not declared below (never _id_)
+INDEX_PRUNE = os.getenv("INDEX_PRUNE", "false").lower() == "true"
+# Workers starting within this many seconds of each other reconcile once
+INDEX_RECONCILE_LEASE = int(os.getenv("INDEX_RECONCILE_LEASE", "60"))
+
+# Declared indexes per collection. Compound indexes end in _id so list
+# endpoints (filter + newest-first keyset pagination) are fully indexed.
+INDEXES = {
+    "users": [
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("role", ASCENDING), ("_id", DESCENDING)], name="role_id"),
+        # Active users per role for the dashboard
+        IndexModel([("last_login_at", ASCENDING), ("role", ASCENDING)], name="last_login_at_role"),
+    ],
+    "assignments": [
+        IndexModel([("subject", ASCENDING), ("_id", DESCENDING)], name="subject_id"),
+        IndexModel([("status", ASCENDING), ("_id", DESCENDING)], name="status_id"),
+        IndexModel([("created_by", ASCENDING), ("_id", DESCENDING)], name="created_by_id"),
+        IndexModel([("due_date", ASCENDING)], name="due_date"),
+        # Covers the version-only lookup behind If-None-Match
+        IndexModel([("_id", ASCENDING), ("version", ASCENDING)], name="id_version"),
+        # Full-text search; title matches rank above subject and description
+        IndexModel(
+            [("title", TEXT), ("subject", TEXT), ("description", TEXT)],
+            name="assignment_text",
+            weights={"title": 10, "subject": 5, "description": 1},
+            default_language="english",
+        ),
+    ],
+    "solutions": [
+        IndexModel([("assignment_id", ASCENDING), ("_id", DESCENDING)], name="assignment_id_id"),
+        IndexModel([("answered_by", ASCENDING), ("_id", DESCENDING)], name="answered_by_id"),
+        IndexModel([("_id", ASCENDING), ("version", ASCENDING)], name="id_version"),
+    ],
+    "blobs": [
+        IndexModel([("refcount", ASCENDING)], name="refcount"),
+    ],
+    "upload_sessions": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at"),
+    ],
+    # Claims pick the most urgent pending request for a helper's subjects
+    "help_requests": [
+        IndexModel([("status", ASCENDING), ("subject_key", ASCENDING), ("priority", ASCENDING), ("_id", ASCENDING)], name="status_subject_priority"),
+        IndexModel([("status", ASCENDING), ("priority", ASCENDING), ("_id", ASCENDING)], name="status_priority"),
+        IndexModel([("claimed_by", ASCENDING), ("status", ASCENDING)], name="claimed_by_status"),
+    ],
+    "profiles": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    # Unread inbox pages, newest first
+    "notifications": [
+        IndexModel([("user_id", ASCENDING), ("is_read", ASCENDING), ("_id", DESCENDING)], name="user_id_is_read_id"),
+        IndexModel([("user_id", ASCENDING), ("_id", DESCENDING)], name="user_id_id"),
+    ],
+    "subscriptions": [
+        IndexModel([("user_id", ASCENDING), ("_id", DESCENDING)], name="user_id_id"),
+        # Scheduler hydration: active subscriptions ending soon
+        IndexModel([("status", ASCENDING), ("end_date", ASCENDING)], name="status_end_date"),
+    ],
+    "reviews": [
+        IndexModel([("assignment_id", ASCENDING), ("user_id", ASCENDING)], name="assignment_id_user_id_unique", unique=True),
+        IndexModel([("assignment_id", ASCENDING), ("_id", DESCENDING)], name="assignment_id_id"),
+    ],
+    # Leaderboards read the materialised aggregates in average order
+    "ratings": [
+        IndexModel([("kind", ASCENDING), ("average", DESCENDING), ("count", DESCENDING)], name="kind_average_count"),
+    ],
+    # Dashboard counters read per group, per-day series by value range
+    "stats": [
+        IndexModel([("group", ASCENDING), ("value", ASCENDING)], name="group_value"),
+    ],
+}
+
+# Index options that make two indexes with the same name different
+COMPARED_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression", "weights", "default_language")
+
+
+def _normalise(spec: dict) -> dict:
+    key = spec["key"]
+    key = [(field, direction) for field, direction in (key.items() if isinstance(key, dict) else key)]
+    normalised = {}
+    for option in COMPARED_OPTIONS:
+        if spec.get(option) is not None:
+            normalised[option] = spec[option]
+    # Mongo reports text indexes as _fts/_ftsx keys plus per-field weights
+    if any(direction == TEXT for _, direction in key):
+        weights = {field: 1 for field, direction in key if direction == TEXT and field != "_fts"}
+        weights.update(spec.get("weights") or {})
+        normalised["weights"] = weights
+        key = [(field, direction) for field, direction in key if direction != TEXT and field != "_ftsx"]
+    normalised["key"] = key
+    return normalised
+
+
+# Compare declared and existing indexes of one collection
+async def diff_collection(name: str, models: list, prune: bool = INDEX_PRUNE) -> dict:
+    existing = await database.get_collection(name).index_information()
+    declared = {model.document["name"]: model for model in models}
+
+    diff = {"create": [], "replace": [], "drop": []}
+    for index_name, model in declared.items():
+        if index_name not in existing:
+            diff["create"].append(index_name)
+        elif _normalise(existing[index_name]) != _normalise(model.document):
+            diff["replace"].append(index_name)
+    if prune:
+        diff["drop"] = [n for n in existing if n != "_id_" and n not in declared]
+    return diff
+
+
+# Bring every collection's indexes in line with INDEXES; returns the diff
+async def reconcile_indexes(dry_run: bool = False, prune: bool = INDEX_PRUNE) -> dict:
+    report = {}
+    for name, models in INDEXES.items():
+        diff = await diff_collection(name, models, prune)
+        report[name] = diff
+        if not any(diff.values()):
+            continue
+        logger.info("Index diff for %s: %s", name, diff)
+        if dry_run:
+            continue
+
+        collection = database.get_collection(name)
+        declared = {model.document["name"]: model for model in models}
+        try:
+            for index_name in diff["drop"] + diff["replace"]:
+                await collection.drop_index(index_name)
+            to_build = [declared[n] for n in diff["create"] + diff["replace"]]
+            if to_build:
+                await collection.create_indexes(to_build)
+        except OperationFailure as e:
+            # e.g. existing duplicates blocking a unique index; startup
+            # refuses to serve without it (reconcile_on_startup)
+            logger.error("Index reconciliation failed for %s: %s", name, e)
+            diff["error"] = str(e)
+    return report
+
+
+# Declared unique indexes that do not exist (as "collection.index")
+async def missing_unique_indexes() -> list:
+    missing = []
+    for name, models in INDEXES.items():
+        unique = [model.document["name"] for model in models if model.document.get("unique")]
+        if not unique:
+            continue
+        existing = await database.get_collection(name).index_information()
+        missing += [f"{name}.{index_name}" for index_name in unique if index_name not in existing]
+    return missing
+
+
+# Run from the application lifespan, by the first worker to start; the
+# others skip it but wait for the unique indexes. Routes such as user
+# registration rely on those for correctness, so a worker never serves
+# without them.
+async def reconcile_on_startup():
+    if INDEX_RECONCILE == "off":
+        return
+    if await Lease("index-reconcile", INDEX_RECONCILE_LEASE).acquire():
+        await reconcile_indexes(dry_run=INDEX_RECONCILE == "dry-run")
+        missing = await missing_unique_indexes()
+    else:
+        logger.info("Index reconciliation running in another worker, skipping")
+        deadline = time.monotonic() + INDEX_RECONCILE_LEASE
+        while (missing := await missing_unique_indexes()) and time.monotonic() < deadline:
+            await asyncio.sleep(1)
+    if missing:
+        raise RuntimeError(f"Unique indexes missing, refusing to start: {', '.join(missing)}")
+
+
+# python indexes.py [--apply] [--prune]  (prints the diff; dry run by default)
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    result = run_with_client(reconcile_indexes, dry_run="--apply" not in sys.argv, prune="--prune" in sys.argv)
+    for collection_name, collection_diff in result.items():
+        print(collection_name, collection_diff)
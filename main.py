@@ -1,13 +1,138 @@
-from fastapi import FastAPI
-from routes.assignment import router as assignment_router
-from routes.solution import router as solution_router
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from routes.assignment import router as assignment_router, UPLOAD_DIR
+from routes.solution import router as solution_router, SOLUTION_UPLOAD_DIR
 from routes.user import router as user_router
 from routes.login import router as login_router  # Import login router
+from routes.upload import router as upload_router
+from routes.help import router as help_router
+from routes.notification import router as notification_router
+from routes.subscription import router as subscription_router
+from routes.review import router as review_router
+from routes.stats import router as stats_router
+from routes.health import router as health_router
+from services.passwords import password_hasher
+from services.auth import auth_metrics, get_current_user
+from services.storage import upload_storage, UploadTooLargeError
+from services.blob_store import blob_store
+from services.read_cache import assignment_cache, solution_cache
+from services.resumable import resumable_uploads, UPLOAD_SESSION_DIR
+from services.help_queue import help_queue, skill_index
+from services.notifications import notification_hub
+from services.scheduler import deadline_scheduler
+from services.stats import stats
+from services.conditional import change_log
+from services.instrumentation import RequestMetrics, command_metrics, instrumentation_snapshot, pool_metrics, render_prometheus, request_metrics
+import database
+from indexes import reconcile_on_startup
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Upload directories (temp parts are written next to the blobs)
+    for directory in (UPLOAD_DIR, SOLUTION_UPLOAD_DIR, UPLOAD_SESSION_DIR):
+        os.makedirs(directory, exist_ok=True)
+    # Wait for Mongo and warm up the connection pool
+    await database.connect()
+    # Make sure every declared index exists before serving traffic
+    await reconcile_on_startup()
+    # Expire abandoned resumable uploads in the background
+    sweeper = asyncio.create_task(resumable_uploads.run_sweeper())
+    # Keep the helper skill index fresh for help-request matching
+    refresher = asyncio.create_task(skill_index.run_refresher())
+    # Persist list change times (Last-Modified) in batches
+    change_flusher = asyncio.create_task(change_log.run_flusher())
+    # Persist published notifications in batches
+    flusher = asyncio.create_task(notification_hub.run_flusher())
+    # Push notifications published by other workers to sockets held here
+    relay = asyncio.create_task(notification_hub.run_relay())
+    # Due-date reminders and subscription expiry (one worker at a time)
+    scheduler = asyncio.create_task(deadline_scheduler.run())
+    # Correct dashboard counter drift (one worker at a time)
+    reconciler = asyncio.create_task(stats.run_reconciler())
+    yield
+    sweeper.cancel()
+    refresher.cancel()
+    relay.cancel()
+    scheduler.cancel()
+    reconciler.cancel()
+    await deadline_scheduler.shutdown()
+    flusher.cancel()
+    await notification_hub.flush()
+    change_flusher.cancel()
+    await change_log.flush()
+    # Release the password hashing workers on shutdown
+    password_hasher.shutdown()
+    await database.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Per-route latency histograms and in-flight gauges
+app.add_middleware(RequestMetrics)
+
+
+# Uploads over the configured size limits
+@app.exception_handler(UploadTooLargeError)
+async def upload_too_large_handler(request: Request, exc: UploadTooLargeError):
+    return JSONResponse(status_code=413, content={"detail": str(exc)})
 
-app = FastAPI()
 
 # Include routers for different routes
 app.include_router(assignment_router, prefix="/assignments", tags=["Assignments"])
 app.include_router(solution_router, prefix="/solutions", tags=["Solutions"])
 app.include_router(user_router, prefix="/users", tags=["Users"])
 app.include_router(login_router, tags=["Authentication"])  # Include login router for auth
+app.include_router(upload_router, prefix="/uploads", tags=["Uploads"])
+app.include_router(help_router, prefix="/help", tags=["Help"])
+app.include_router(notification_router, prefix="/notifications", tags=["Notifications"])
+app.include_router(subscription_router, prefix="/subscriptions", tags=["Subscriptions"])
+app.include_router(review_router, prefix="/reviews", tags=["Reviews"])
+app.include_router(stats_router, prefix="/stats", tags=["Statistics"])
+app.include_router(health_router, tags=["Monitoring"])
+
+
+# Runtime metrics: Prometheus text by default, ?format=json for the
+# nested snapshot with per-route and per-command summaries. Counters and
+# latencies only; query shapes and profiles are under the admin routes below
+@app.get("/metrics", tags=["Monitoring"])
+async def get_metrics(format: str = Query("prometheus", pattern="^(prometheus|json)$")):
+    snapshot = {
+        "password_hashing": password_hasher.metrics(),
+        "auth": auth_metrics(),
+        "uploads": upload_storage.metrics(),
+        "blobs": blob_store.metrics(),
+        "read_cache": {"assignments": assignment_cache.metrics(), "solutions": solution_cache.metrics()},
+        "help_queue": {**help_queue.metrics(), "depth": await help_queue.depth()},
+        "notifications": notification_hub.metrics(),
+        "changes": change_log.metrics(),
+        "scheduler": deadline_scheduler.metrics(),
+        "stats": stats.metrics(),
+        "mongo_pool": pool_metrics.metrics(),
+    }
+    if format == "json":
+        return {**snapshot, **instrumentation_snapshot()}
+    return PlainTextResponse(render_prometheus(snapshot), media_type="text/plain; version=0.0.4")
+
+
+def require_admin(current_user: dict):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can view query details and profiles.")
+
+
+# Recent slow Mongo commands with their filter/sort shape (MONGO_SLOW_MS)
+@app.get("/metrics/slow", tags=["Monitoring"])
+async def get_slow_commands(current_user: dict = Depends(get_current_user)):
+    require_admin(current_user)
+    return list(command_metrics.recent_slow)
+
+
+# Profiles of sampled slow requests (PROFILE_SAMPLE_RATE, PROFILE_SLOW_MS)
+@app.get("/metrics/profiles", tags=["Monitoring"])
+async def get_profiles(current_user: dict = Depends(get_current_user)):
+    require_admin(current_user)
+    middleware = request_metrics.middleware
+    return list(middleware.profiles) if middleware else []
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 class Assignment(BaseModel):
@@ -7,6 +7,27 @@ class Assignment(BaseModel):
     description: str
     subject: str
     files: Optional[List[str]] = []  # List of file paths or URLs
-    created_by: Optional[datetime] = None
+    file_names: Optional[List[str]] = []  # Client filenames, parallel to files
+    created_by: Optional[str] = None  # Username of the creator
     status: str = "pending"  # Default to 'pending'
-    due_date: Optional[datetime] = None  # Optional due date
\ No newline at end of file
+    due_date: Optional[datetime] = None  # Optional due date
+    created_at: Optional[datetime] = None  # Set by the server on creation
+
+# Assignment as returned by list views; only the projected fields are set
+class AssignmentListItem(BaseModel):
+    id: str
+    title: Optional[str] = None
+    description: Optional[str] = None
+    subject: Optional[str] = None
+    files: Optional[List[str]] = None
+    file_names: Optional[List[str]] = None
+    created_by: Optional[str] = None
+    status: Optional[str] = None
+    due_date: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    score: Optional[float] = None  # Relevance, search results only
+
+# Page of search results with optional facet counts per field
+class AssignmentSearchResult(BaseModel):
+    results: List[AssignmentListItem]
+    facets: Optional[Dict[str, Dict[str, int]]] = None
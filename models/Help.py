@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Optional
 from pydantic import BaseModel
 
 
@@ -7,3 +8,8 @@ class HelpRequest(BaseModel):
     requested_by: str  # User ID of the requester
     status: str = "pending"  # e.g., 'pending', 'in-progress', 'completed'
     created_at: datetime
+    subject: Optional[str] = None  # Copied from the assignment for matching
+    due_date: Optional[datetime] = None  # Copied from the assignment for priority
+    claimed_by: Optional[str] = None  # Helper working on it
+    claimed_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
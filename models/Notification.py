@@ -1,9 +1,11 @@
 from pydantic import BaseModel
-
+from typing import Optional
 from datetime import datetime
 
 class Notification(BaseModel):
     user_id: str  # User receiving the notification
     message: str
     created_at: datetime
-    is_read: bool = False  # Flag to indicate if the notification has been read
\ No newline at end of file
+    is_read: bool = False  # Flag to indicate if the notification has been read
+    event: Optional[str] = None  # e.g., 'solution.created', 'assignment.status'
+    assignment_id: Optional[str] = None  # Assignment the notification is about
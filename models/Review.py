@@ -8,4 +8,6 @@ class Review(BaseModel):
     user_id: str  # ID of the user giving the review
     rating: int  # Rating out of 5
     comment: Optional[str] = None  # Optional review comment
-    created_at: datetime
\ No newline at end of file
+    created_at: datetime
+    solution_id: Optional[str] = None  # Solution being rated, if any
+    helper: Optional[str] = None  # answered_by of that solution, for per-helper ratings
@@ -5,5 +5,6 @@ from datetime import datetime
 class Solution(BaseModel):
     assignment_id: str
     answer_file: Optional[List[str]] = []
+    answer_file_names: Optional[List[str]] = []  # Client filenames, parallel to answer_file
     answered_by: str  # helper/admin id
     submitted_on: datetime
\ No newline at end of file
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Optional, List
+from typing import List, Optional
+from pydantic import BaseModel
 class UserProfile(BaseModel):
     user_id: str  # User ID linked to the registration
     bio: Optional[str] = None
     profile_picture: Optional[str] = None  # URL to profile picture
-    skills: Optional[List[str]] = []  # List of skills or subjects of expertise
\ No newline at end of file
+    skills: Optional[List[str]] = []  # List of skills or subjects of expertise
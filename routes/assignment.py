@@ -1,27 +1,27 @@
-from fastapi import APIRouter, HTTPException, Depends, File, UploadFile, Form
-from models.Assignment import Assignment
-from database import assignment_collection, user_collection
+from fastapi import APIRouter, HTTPException, Depends, File, UploadFile, Form, Query, Request, Response
+from models.Assignment import Assignment, AssignmentListItem, AssignmentSearchResult
 from bson import ObjectId
 from typing import List, Optional
 from datetime import datetime
-import shutil
-import os
-from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+from services.auth import get_current_user
+from services.blob_store import blob_store, stored_filename
+from services.repository import assignment_repository, solution_repository
+from services.read_cache import assignment_cache
+from services.notifications import notification_hub
+from services.scheduler import REMINDER, deadline_scheduler
+from services.stats import stats
+from services.responses import respond
+from services.export import export_response
+from services.downloads import file_response
+from services.search import text_search
+from services.bulk import BULK_BATCH_SIZE, MAX_BULK_BATCH_SIZE, detect_format, ingest
+from services.conditional import current_version, etag_matches, http_date, last_modified, make_etag, not_modified, not_modified_since
+from services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, parse_fields, set_next_cursor
 
 router = APIRouter()
 
 # Path to save uploaded files
 UPLOAD_DIR = "uploaded_files"
-if not os.path.exists(UPLOAD_DIR):
-    os.makedirs(UPLOAD_DIR)
-
-# JWT configurations
-SECRET_KEY = "your_secret_key"  # Use your actual secret key
-ALGORITHM = "HS256"
-
-# OAuth2PasswordBearer to get the token
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 # Helper function to convert MongoDB ObjectId to string
 def assignment_helper(assignment) -> dict:
@@ -31,32 +31,48 @@ def assignment_helper(assignment) -> dict:
         "description": assignment["description"],
         "subject": assignment["subject"],
         "files": assignment["files"],
+        "file_names": assignment.get("file_names", []),
         "created_by": assignment["created_by"],
         "status": assignment["status"],
         "due_date": assignment["due_date"],
-        "created_at": assignment.get("created_at")  # Use get to avoid KeyError
+        "created_at": assignment.get("created_at"),  # Use get to avoid KeyError
+        "version": assignment.get("version", 0)  # For the ETag; not part of the response body
     }
 
-# Get current user
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    credentials_exception = HTTPException(
-        status_code=401,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-
-    # Fetch user from users_collection
-    user = await user_collection.find_one({"username": username})
-    if user is None:
-        raise credentials_exception
-    return user
+# Fields list views may project; description and files are opt-in
+ASSIGNMENT_FIELDS = ["title", "description", "subject", "files", "file_names", "created_by", "status", "due_date", "created_at"]
+ASSIGNMENT_LIST_FIELDS = ["title", "subject", "created_by", "status", "due_date", "created_at"]
+
+# Helper function for projected documents: only copies the fields present
+def assignment_list_helper(assignment) -> dict:
+    item = {"id": str(assignment["_id"])}
+    for field in ASSIGNMENT_FIELDS:
+        if field in assignment:
+            item[field] = assignment[field]
+    return item
+
+# Build the Mongo filter shared by the assignment list endpoints
+def assignment_filter(
+    subject: Optional[str] = None,
+    status: Optional[str] = None,
+    created_by: Optional[str] = None,
+    due_after: Optional[datetime] = None,
+    due_before: Optional[datetime] = None,
+) -> dict:
+    query = {}
+    if subject:
+        query["subject"] = subject
+    if status:
+        query["status"] = status
+    if created_by:
+        query["created_by"] = created_by
+    if due_after or due_before:
+        query["due_date"] = {}
+        if due_after:
+            query["due_date"]["$gte"] = due_after
+        if due_before:
+            query["due_date"]["$lt"] = due_before
+    return query
 
 # Create a new assignment with file upload and form data
 @router.post("/", response_model=Assignment)
@@ -69,15 +85,11 @@ async def create_assignment(
     current_user: dict = Depends(get_current_user),  # Get current user
     files: Optional[List[UploadFile]] = File(None)
 ):
-    file_paths = []
+    file_paths, file_names = [], []
     
-    # Save uploaded files and store their paths
+    # Store uploaded files (deduplicated by content) and keep their paths
     if files:
-        for file in files:
-            file_path = os.path.join(UPLOAD_DIR, file.filename)
-            with open(file_path, "wb") as f:
-                shutil.copyfileobj(file.file, f)
-            file_paths.append(file_path)  # Store file path
+        file_paths, file_names = await blob_store.save(files, UPLOAD_DIR)
 
     # Build Assignment instance using form data and saved file paths
     assignment = Assignment(
@@ -85,6 +97,7 @@ async def create_assignment(
         description=description,
         subject=subject,
         files=file_paths,
+        file_names=file_names,
         created_by=current_user['username'],  # Use current user's username
         status=status,
         due_date=due_date,
@@ -93,28 +106,149 @@ async def create_assignment(
     
     # Convert assignment model to dict and insert into database
     assignment_dict = assignment.dict()
-    new_assignment = await assignment_collection.insert_one(assignment_dict)
-    created_assignment = await assignment_collection.find_one({"_id": new_assignment.inserted_id})
+    created_assignment = await assignment_repository.insert(assignment_dict)
+    deadline_scheduler.schedule_assignment(created_assignment)
+    await stats.record("assignments", added=[created_assignment])
 
     return assignment_helper(created_assignment)
 
-# Get all assignments
-@router.get("/", response_model=List[Assignment])
-async def get_assignments():
-    assignments = []
-    async for assignment in assignment_collection.find():
-        assignments.append(assignment_helper(assignment))
-    return assignments
+# Import many assignments from an NDJSON or CSV file (admins only)
+@router.post("/bulk")
+async def bulk_create_assignments(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+    batch_size: int = Query(BULK_BATCH_SIZE, ge=1, le=MAX_BULK_BATCH_SIZE),
+    current_user: dict = Depends(get_current_user)
+):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can import assignments.")
+
+    async def prepare(assignments):
+        created_at = datetime.utcnow()
+        documents = []
+        for assignment in assignments:
+            document = assignment.dict()
+            # Files are only attached through uploads, which take the blob
+            # references; a row must not point at paths of its own
+            # (version is set by insert_many)
+            document["files"] = []
+            document["file_names"] = []
+            document["created_by"] = assignment.created_by or current_user["username"]
+            document["created_at"] = created_at
+            documents.append(document)
+        return documents
+
+    # Count each batch's inserted rows as it is written
+    async def inserted(documents):
+        await stats.record("assignments", added=documents)
+
+    return await ingest(file, detect_format(file, format), Assignment, assignment_repository, prepare, batch_size, inserted)
+
+# Get assignments, newest first, one page at a time
+@router.get("/", response_model=List[AssignmentListItem], response_model_exclude_unset=True)
+async def get_assignments(
+    request: Request,
+    response: Response,
+    query: dict = Depends(assignment_filter),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Value of the previous page's X-Next-Cursor header"),
+):
+    projection = parse_fields(fields, ASSIGNMENT_FIELDS, ASSIGNMENT_LIST_FIELDS)
+
+    # Nothing was created, updated or deleted since the client's copy
+    changed = await last_modified("assignments")
+    if changed:
+        if not_modified_since(request, changed):
+            return not_modified(last_modified=changed)
+        response.headers["Last-Modified"] = http_date(changed)
+
+    assignments, next_cursor = await paginate(
+        assignment_repository.collection, query, projection, limit, cursor, assignment_list_helper
+    )
+    set_next_cursor(response, next_cursor)
+    return respond(assignments, AssignmentListItem, response)
+
+# Stream all matching assignments as NDJSON or CSV (admins only)
+@router.get("/export")
+async def export_assignments(
+    query: dict = Depends(assignment_filter),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = Query(False, description="Compress the export on the fly"),
+    current_user: dict = Depends(get_current_user)
+):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can export assignments.")
+    return export_response(
+        assignment_repository.collection, query, ASSIGNMENT_FIELDS, assignment_list_helper, "assignments", format, gzip
+    )
+
+# Full-text search over title, subject and description, best match first
+@router.get("/search", response_model=AssignmentSearchResult, response_model_exclude_unset=True)
+async def search_assignments(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    query: dict = Depends(assignment_filter),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Value of the previous page's X-Next-Cursor header"),
+    facets: bool = Query(True, description="Include subject/status counts (first page only)"),
+):
+    projection = parse_fields(fields, ASSIGNMENT_FIELDS, ASSIGNMENT_LIST_FIELDS)
+    results, next_cursor, facet_counts = await text_search(
+        assignment_repository.collection,
+        q,
+        query,
+        projection,
+        limit,
+        cursor,
+        lambda assignment: {**assignment_list_helper(assignment), "score": assignment["score"]},
+        with_facets=facets and not cursor,
+    )
+    set_next_cursor(response, next_cursor)
+    result = {"results": results}
+    if facet_counts is not None:
+        result["facets"] = facet_counts
+    return respond(result, response=response)
 
 # Get a single assignment by ID
 @router.get("/{id}", response_model=Assignment)
-async def get_assignment(id: str):
+async def get_assignment(id: str, request: Request, response: Response):
     if not ObjectId.is_valid(id):
         raise HTTPException(status_code=400, detail="Invalid ID")
-    assignment = await assignment_collection.find_one({"_id": ObjectId(id)})
+
+    # Unchanged since the client's copy: answer from the version alone
+    if request.headers.get("if-none-match"):
+        version = await current_version(id, assignment_repository, assignment_cache)
+        if version is not None and etag_matches(request, make_etag(id, version)):
+            return not_modified(etag=make_etag(id, version))
+
+    async def load():
+        assignment = await assignment_repository.get(id)
+        return assignment_helper(assignment) if assignment else None
+
+    # Served from the read-through cache; concurrent misses share one query
+    assignment = await assignment_cache.get(id, load)
     if assignment is None:
         raise HTTPException(status_code=404, detail="Assignment not found")
-    return assignment_helper(assignment)
+    response.headers["ETag"] = make_etag(id, assignment["version"])
+    return respond(assignment, Assignment, response)
+
+# Download one file of an assignment (supports HTTP Range)
+@router.get("/{id}/files/{index}")
+async def download_assignment_file(
+    id: str,
+    index: int,
+    request: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    if not ObjectId.is_valid(id):
+        raise HTTPException(status_code=400, detail="Invalid ID")
+    assignment = await assignment_repository.get(id, {"files": 1, "file_names": 1})
+    files = (assignment or {}).get("files") or []
+    if not 0 <= index < len(files):
+        raise HTTPException(status_code=404, detail="File not found")
+    return await file_response(request, files[index], stored_filename(files, assignment.get("file_names"), index))
 
 # Update an assignment by ID (allows updating with files)
 @router.put("/{id}", response_model=Assignment)
@@ -143,23 +277,40 @@ async def update_assignment(
         assignment_data["status"] = status
     if due_date:
         assignment_data["due_date"] = due_date
+        assignment_data["reminder_sent_at"] = None  # Remind again for the new date
     
     # Save uploaded files if any
     if files:
-        assignment_data["files"] = []
-        for file in files:
-            file_path = os.path.join(UPLOAD_DIR, file.filename)
-            with open(file_path, "wb") as f:
-                shutil.copyfileobj(file.file, f)
-            assignment_data["files"].append(file_path)
-
-    # Update the assignment in the database
-    update_result = await assignment_collection.update_one({"_id": ObjectId(id)}, {"$set": assignment_data})
+        assignment_data["files"], assignment_data["file_names"] = await blob_store.save(files, UPLOAD_DIR)
+
+    # Update the assignment in the database, keeping the replaced file list
+    previous, updated_assignment = await assignment_repository.update_with_previous(id, assignment_data)
     
-    if update_result.modified_count == 0:
+    if previous is None:
+        await blob_store.release(assignment_data.get("files"))
         raise HTTPException(status_code=404, detail="Assignment not found")
+
+    # Drop references to the files this update replaced
+    if "files" in assignment_data:
+        await blob_store.release(previous.get("files"))
+    if "status" in assignment_data or "subject" in assignment_data:
+        await stats.record("assignments", added=[updated_assignment], removed=[previous])
+
+    await assignment_cache.invalidate(id)
+    if due_date:
+        deadline_scheduler.schedule_assignment(updated_assignment)
+
+    # Tell the creator and everyone who answered that the status moved
+    if status and previous.get("status") != status:
+        helpers = await solution_repository.collection.distinct("answered_by", {"assignment_id": id})
+        recipients = {updated_assignment["created_by"], *helpers} - {current_user["username"]}
+        notification_hub.publish(
+            recipients,
+            f"\"{updated_assignment['title']}\" is now {status}",
+            event="assignment.status",
+            assignment_id=id,
+        )
     
-    updated_assignment = await assignment_collection.find_one({"_id": ObjectId(id)})
     return assignment_helper(updated_assignment)
 
 # Delete an assignment by ID
@@ -167,9 +318,15 @@ async def update_assignment(
 async def delete_assignment(id: str):
     if not ObjectId.is_valid(id):
         raise HTTPException(status_code=400, detail="Invalid ID")
-    delete_result = await assignment_collection.delete_one({"_id": ObjectId(id)})
+    deleted = await assignment_repository.delete(id, projection={"files": 1, "status": 1, "subject": 1, "created_at": 1})
     
-    if delete_result.deleted_count == 0:
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Assignment not found")
+
+    # Collect files no other assignment references
+    await blob_store.release(deleted.get("files"))
+    await assignment_cache.invalidate(id)
+    deadline_scheduler.schedule(REMINDER, id, None)
+    await stats.record("assignments", removed=[deleted])
     
     return {"message": "Assignment deleted successfully"}
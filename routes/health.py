@@ -0,0 +1,47 @@
+import os
+import time
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+import database
+from services.instrumentation import pool_metrics
+
+router = APIRouter()
+
+# Probe configuration
+HEALTH_PING_TIMEOUT = float(os.getenv("HEALTH_PING_TIMEOUT", "1"))  # seconds
+READY_MAX_POOL_SATURATION = float(os.getenv("READY_MAX_POOL_SATURATION", "0.9"))
+
+STARTED_AT = time.time()
+
+async def mongo_check() -> dict:
+    started = time.perf_counter()
+    try:
+        await database.ping(HEALTH_PING_TIMEOUT)
+    except Exception as e:
+        return {"ok": False, "error": f"{type(e).__name__}: {e}"[:200]}
+    return {"ok": True, "ping_ms": round((time.perf_counter() - started) * 1000, 3)}
+
+# Liveness: the worker serves requests and can reach Mongo
+@router.get("/healthz")
+async def healthz():
+    mongo = await mongo_check()
+    body = {"status": "ok" if mongo["ok"] else "unavailable", "uptime_seconds": round(time.time() - STARTED_AT), "mongo": mongo}
+    return JSONResponse(status_code=200 if mongo["ok"] else 503, content=body)
+
+# Readiness: also warmed up and with pool headroom, so the orchestrator
+# stops routing traffic to a worker whose pool is exhausted
+@router.get("/readyz")
+async def readyz():
+    mongo = await mongo_check()
+    pool = pool_metrics.metrics()
+    reasons = []
+    if not database.connected:
+        reasons.append("not connected")
+    if not mongo["ok"]:
+        reasons.append("mongo unreachable")
+    if pool["saturation"] >= READY_MAX_POOL_SATURATION:
+        reasons.append("connection pool saturated")
+    if pool["waiting"] > 0 and pool["checked_out"] >= (pool["max_pool_size"] or 0):
+        reasons.append("requests queued for a connection")
+    body = {"status": "not ready" if reasons else "ready", "reasons": reasons, "mongo": mongo, "pool": pool}
+    return JSONResponse(status_code=503 if reasons else 200, content=body)
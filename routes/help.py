@@ -0,0 +1,94 @@
+from fastapi import APIRouter, HTTPException, Depends, Form, Query
+from bson import ObjectId
+from typing import Optional
+from services.auth import get_current_user
+from services.repository import assignment_repository
+from services.help_queue import help_queue, skill_index
+from services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+router = APIRouter()
+
+# Helper function to convert MongoDB ObjectId to string
+def help_request_helper(request) -> dict:
+    return {
+        "id": str(request["_id"]),
+        "assignment_id": request["assignment_id"],
+        "requested_by": request["requested_by"],
+        "status": request["status"],
+        "created_at": request["created_at"],
+        "subject": request.get("subject"),
+        "due_date": request.get("due_date"),
+        "claimed_by": request.get("claimed_by"),
+        "claimed_at": request.get("claimed_at"),
+        "completed_at": request.get("completed_at"),
+    }
+
+def require_helper(current_user: dict):
+    if current_user["role"] not in ["helper", "admin"]:
+        raise HTTPException(status_code=403, detail="Only helpers and admins can work on help requests.")
+
+# Ask for help with an assignment
+@router.post("/")
+async def create_help_request(
+    assignment_id: str = Form(...),
+    current_user: dict = Depends(get_current_user)
+):
+    if not ObjectId.is_valid(assignment_id):
+        raise HTTPException(status_code=400, detail="Invalid ID")
+    assignment = await assignment_repository.get(assignment_id, {"subject": 1, "due_date": 1})
+    if assignment is None:
+        raise HTTPException(status_code=404, detail="Assignment not found")
+
+    request = await help_queue.enqueue(assignment, current_user["username"])
+    return {**help_request_helper(request), "matching_helpers": len(skill_index.helpers_for(request["subject"]))}
+
+# Pending requests matching the current helper's skills, most urgent first
+@router.get("/queue", response_model=Optional[list])
+async def get_help_queue(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: dict = Depends(get_current_user)
+):
+    require_helper(current_user)
+    requests = await help_queue.pending(current_user["_id"], limit)
+    return [help_request_helper(request) for request in requests]
+
+# Claim the most urgent pending request matching the helper's skills
+@router.post("/claim")
+async def claim_next_help_request(current_user: dict = Depends(get_current_user)):
+    require_helper(current_user)
+    request = await help_queue.claim_next(current_user)
+    if request is None:
+        raise HTTPException(status_code=404, detail="No matching help requests")
+    return help_request_helper(request)
+
+# Claim a specific pending request
+@router.post("/{id}/claim")
+async def claim_help_request(id: str, current_user: dict = Depends(get_current_user)):
+    require_helper(current_user)
+    if not ObjectId.is_valid(id):
+        raise HTTPException(status_code=400, detail="Invalid ID")
+    request = await help_queue.claim(ObjectId(id), current_user)
+    if request is None:
+        raise HTTPException(status_code=409, detail="Help request is not pending")
+    return help_request_helper(request)
+
+# Mark a claimed request as completed
+@router.post("/{id}/complete")
+async def complete_help_request(id: str, current_user: dict = Depends(get_current_user)):
+    require_helper(current_user)
+    if not ObjectId.is_valid(id):
+        raise HTTPException(status_code=400, detail="Invalid ID")
+    request = await help_queue.complete(ObjectId(id), current_user)
+    if request is None:
+        raise HTTPException(status_code=409, detail="Help request is not in progress for you")
+    return help_request_helper(request)
+
+# Get a help request by ID
+@router.get("/{id}")
+async def get_help_request(id: str, current_user: dict = Depends(get_current_user)):
+    if not ObjectId.is_valid(id):
+        raise HTTPException(status_code=400, detail="Invalid ID")
+    request = await help_queue.collection.find_one({"_id": ObjectId(id)})
+    if request is None:
+        raise HTTPException(status_code=404, detail="Help request not found")
+    return help_request_helper(request)
@@ -1,49 +1,33 @@
 from fastapi import APIRouter, HTTPException, Depends
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi.security import OAuth2PasswordRequestForm
 from models.Login import UserLogin
 from database import user_collection
-from passlib.context import CryptContext
-from bson import ObjectId
-from jose import JWTError, jwt
-from datetime import datetime, timedelta
+from services.passwords import password_hasher, HasherBusyError
+from services.auth import get_current_user
+from services.stats import stats
+from services.security import ACCESS_TOKEN_EXPIRE_MINUTES, encode_token
+from datetime import timedelta
 from typing import Optional
 
-# JWT configurations
-SECRET_KEY = "your_secret_key"  # Make sure to replace with a secure secret
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60  # Set token expiration to 1 hour
-
 router = APIRouter()
 
-# Initialize password hasher
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-# OAuth2PasswordBearer to get the token
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
-
-# Helper function to verify password
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+# Helper function to verify password (runs on the shared hashing pool)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return await password_hasher.verify(plain_password, hashed_password)
+    except HasherBusyError:
+        raise HTTPException(status_code=503, detail="Too many login attempts, please retry", headers={"Retry-After": "1"})
 
 # Helper function to authenticate user
 async def authenticate_user(username: str, password: str):
     user = await user_collection.find_one({"username": username})
-    if not user or not verify_password(password, user["password"]):
+    if not user or not await verify_password(password, user["password"]):
         return False
     return user
 
 # Create access token
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
-    to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta if expires_delta else timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
-
-# Function to convert MongoDB document to a dictionary and handle ObjectId
-def user_to_dict(user):
-    user_dict = {k: (str(v) if isinstance(v, ObjectId) else v) for k, v in user.items()}
-    return user_dict
+    return encode_token(data, expires_delta)
 
 # Login route
 @router.post("/login")
@@ -54,6 +38,7 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
             status_code=400,
             detail="Incorrect username or password"
         )
+    await stats.record_login(user)
     
     # Create token with user role
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -63,27 +48,6 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
-# Get current user
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    credentials_exception = HTTPException(
-        status_code=401,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        role: str = payload.get("role")  # Retrieve role from token
-        if username is None or role is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    user = await user_collection.find_one({"username": username})
-    if user is None:
-        raise credentials_exception
-    return user_to_dict(user)  # Convert the user object to dict
-
 # Protected route example
 @router.get("/me")
 async def read_users_me(current_user: dict = Depends(get_current_user)):
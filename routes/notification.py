@@ -0,0 +1,92 @@
+import asyncio
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, Form, Query, Response, WebSocket, WebSocketDisconnect
+from bson import ObjectId
+from typing import List, Optional
+from services.auth import decode_token, get_current_user
+from services.notifications import notification_hub, notification_helper
+from services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, set_next_cursor
+
+router = APIRouter()
+
+NOTIFICATION_FIELDS = ["user_id", "message", "created_at", "is_read", "event", "assignment_id"]
+
+# Close code telling a slow client to reconnect and catch up from the inbox
+TRY_AGAIN_LATER = 1013
+
+# Push notifications for the token's user as they are published.
+# Browsers cannot set headers on a WebSocket, so the token comes in the query.
+@router.websocket("/ws")
+async def notification_socket(websocket: WebSocket, token: str = Query(...)):
+    try:
+        user_id = decode_token(token)["sub"]
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    subscriber = notification_hub.connect(user_id)
+
+    async def send():
+        while True:
+            message = await subscriber.queue.get()
+            if subscriber.overflowed:
+                await websocket.close(code=TRY_AGAIN_LATER)
+                return
+            await websocket.send_json(message)
+
+    # Incoming frames are ignored; reading them is how a disconnect shows up
+    async def receive():
+        while True:
+            await websocket.receive_text()
+
+    tasks = [asyncio.create_task(send()), asyncio.create_task(receive())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        notification_hub.disconnect(subscriber)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+# Get the current user's notifications, newest first, one page at a time
+@router.get("/", response_model=Optional[list])
+async def get_notifications(
+    response: Response,
+    unread: bool = Query(True, description="Only notifications not yet marked as read"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Value of the previous page's X-Next-Cursor header"),
+    current_user: dict = Depends(get_current_user)
+):
+    # Include notifications still waiting for the next batched write
+    await notification_hub.flush()
+
+    query = {"user_id": current_user["username"]}
+    if unread:
+        query["is_read"] = False
+    notifications, next_cursor = await paginate(
+        notification_hub.collection, query, NOTIFICATION_FIELDS, limit, cursor, notification_helper
+    )
+    set_next_cursor(response, next_cursor)
+    return notifications
+
+# Mark notifications as read, either by ID or all at once
+@router.post("/read")
+async def mark_notifications_read(
+    ids: List[str] = Form([]),
+    mark_all: bool = Form(False, alias="all"),
+    current_user: dict = Depends(get_current_user)
+):
+    if not ids and not mark_all:
+        raise HTTPException(status_code=400, detail="Pass notification ids or all=true")
+    if not all(ObjectId.is_valid(id) for id in ids):
+        raise HTTPException(status_code=400, detail="Invalid ID")
+    await notification_hub.flush()
+
+    query = {"user_id": current_user["username"], "is_read": False}
+    if not mark_all:
+        query["_id"] = {"$in": [ObjectId(id) for id in ids]}
+    result = await notification_hub.collection.update_many(query, {"$set": {"is_read": True, "read_at": datetime.utcnow()}})
+    return {"updated": result.modified_count}
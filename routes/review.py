@@ -0,0 +1,161 @@
+from fastapi import APIRouter, HTTPException, Depends, Form, Query, Response
+from models.Review import Review
+from bson import ObjectId
+from typing import Optional
+from datetime import datetime
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from database import review_collection
+from services.auth import get_current_user
+from services.repository import assignment_repository, solution_repository
+from services.ratings import ASSIGNMENT, HELPER, rating_aggregates
+from services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, set_next_cursor
+
+router = APIRouter()
+
+REVIEW_FIELDS = ["assignment_id", "user_id", "rating", "comment", "created_at", "solution_id", "helper"]
+
+# Helper function to convert MongoDB ObjectId to string
+def review_helper(review) -> dict:
+    return {
+        "id": str(review["_id"]),
+        "assignment_id": review["assignment_id"],
+        "user_id": review["user_id"],
+        "rating": review["rating"],
+        "comment": review.get("comment"),
+        "created_at": review["created_at"],
+        "solution_id": review.get("solution_id"),
+        "helper": review.get("helper"),
+    }
+
+def rating_helper(aggregate) -> dict:
+    return {
+        "kind": aggregate["kind"],
+        "key": aggregate["key"],
+        "count": aggregate["count"],
+        "sum": aggregate["sum"],
+        "average": aggregate.get("average"),
+        "histogram": {str(rating): aggregate.get("histogram", {}).get(str(rating), 0) for rating in range(1, 6)},
+    }
+
+async def get_own_review(id: str, current_user: dict) -> dict:
+    if not ObjectId.is_valid(id):
+        raise HTTPException(status_code=400, detail="Invalid ID")
+    review = await review_collection.find_one({"_id": ObjectId(id)})
+    if review is None:
+        raise HTTPException(status_code=404, detail="Review not found")
+    if review["user_id"] != current_user["username"] and current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="You can only change your own reviews.")
+    return review
+
+# Review an assignment, optionally rating one of its solutions (and so its helper)
+@router.post("/")
+async def create_review(
+    assignment_id: str = Form(...),
+    rating: int = Form(..., ge=1, le=5),
+    comment: Optional[str] = Form(None),
+    solution_id: Optional[str] = Form(None),
+    current_user: dict = Depends(get_current_user)
+):
+    if not ObjectId.is_valid(assignment_id) or (solution_id and not ObjectId.is_valid(solution_id)):
+        raise HTTPException(status_code=400, detail="Invalid ID")
+    if await assignment_repository.get(assignment_id, {"_id": 1}) is None:
+        raise HTTPException(status_code=404, detail="Assignment not found")
+
+    helper = None
+    if solution_id:
+        solution = await solution_repository.get(solution_id, {"assignment_id": 1, "answered_by": 1})
+        if solution is None or solution["assignment_id"] != assignment_id:
+            raise HTTPException(status_code=404, detail="Solution not found for this assignment")
+        helper = solution["answered_by"]
+
+    review = Review(
+        assignment_id=assignment_id,
+        user_id=current_user["username"],
+        rating=rating,
+        comment=comment,
+        created_at=datetime.utcnow(),
+        solution_id=solution_id,
+        helper=helper,
+    ).dict()
+
+    # One review per user and assignment (unique index)
+    try:
+        result = await review_collection.insert_one(review)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="You have already reviewed this assignment.")
+    review["_id"] = result.inserted_id
+    await rating_aggregates.added(review)
+
+    return review_helper(review)
+
+# Change the rating or comment of a review
+@router.put("/{id}")
+async def update_review(
+    id: str,
+    rating: Optional[int] = Form(None, ge=1, le=5),
+    comment: Optional[str] = Form(None),
+    current_user: dict = Depends(get_current_user)
+):
+    await get_own_review(id, current_user)
+    update_data = {}
+    if rating:
+        update_data["rating"] = rating
+    if comment is not None:
+        update_data["comment"] = comment
+    if not update_data:
+        raise HTTPException(status_code=400, detail="Nothing to update")
+
+    previous = await review_collection.find_one_and_update(
+        {"_id": ObjectId(id)}, {"$set": update_data}, return_document=ReturnDocument.BEFORE
+    )
+    if previous is None:
+        raise HTTPException(status_code=404, detail="Review not found")
+    if rating:
+        await rating_aggregates.changed(previous, rating)
+
+    return review_helper({**previous, **update_data})
+
+# Delete a review
+@router.delete("/{id}")
+async def delete_review(id: str, current_user: dict = Depends(get_current_user)):
+    await get_own_review(id, current_user)
+    deleted = await review_collection.find_one_and_delete({"_id": ObjectId(id)})
+    if deleted is None:
+        raise HTTPException(status_code=404, detail="Review not found")
+    await rating_aggregates.removed(deleted)
+    return {"message": "Review deleted successfully"}
+
+# Reviews of an assignment, newest first, one page at a time
+@router.get("/assignment/{assignment_id}", response_model=Optional[list])
+async def get_reviews_by_assignment(
+    assignment_id: str,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Value of the previous page's X-Next-Cursor header"),
+):
+    reviews, next_cursor = await paginate(
+        review_collection, {"assignment_id": assignment_id}, REVIEW_FIELDS, limit, cursor, review_helper
+    )
+    set_next_cursor(response, next_cursor)
+    return reviews
+
+# Top rated helpers or assignments, from the materialised aggregates
+@router.get("/leaderboard", response_model=Optional[list])
+async def get_leaderboard(
+    kind: str = Query(HELPER, pattern=f"^({HELPER}|{ASSIGNMENT})$"),
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    min_count: int = Query(1, ge=1),
+):
+    aggregates = await rating_aggregates.leaderboard(kind, limit, min_count)
+    return [rating_helper(aggregate) for aggregate in aggregates]
+
+# Rating summary of one assignment or helper
+@router.get("/ratings/{kind}/{key}")
+async def get_rating(kind: str, key: str):
+    if kind not in (ASSIGNMENT, HELPER):
+        raise HTTPException(status_code=404, detail="Unknown rating kind")
+    aggregate = await rating_aggregates.get(kind, key)
+    if aggregate is None:
+        return rating_helper({"kind": kind, "key": key, "count": 0, "sum": 0})
+    return rating_helper(aggregate)
@@ -1,19 +1,24 @@
-from fastapi import APIRouter, HTTPException, Depends, File, UploadFile, Form
+from fastapi import APIRouter, HTTPException, Depends, File, UploadFile, Form, Query, Request, Response
 from models.Solution import Solution
-from database import solution_collection
 from bson import ObjectId
 from typing import List, Optional
 from datetime import datetime
-import shutil
-import os
-from routes.login import get_current_user  # Import to access current user
+from services.auth import get_current_user  # Import to access current user
+from services.blob_store import blob_store, stored_filename
+from services.repository import assignment_repository, solution_repository
+from services.read_cache import solution_cache
+from services.notifications import notification_hub
+from services.stats import stats
+from services.responses import respond
+from services.export import export_response
+from services.downloads import file_response, zip_response
+from services.conditional import current_version, etag_matches, http_date, last_modified, make_etag, not_modified, not_modified_since
+from services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, set_next_cursor
 
 router = APIRouter()
 
 # Path to save uploaded solution files
 SOLUTION_UPLOAD_DIR = "solution_files"
-if not os.path.exists(SOLUTION_UPLOAD_DIR):
-    os.makedirs(SOLUTION_UPLOAD_DIR)
 
 # Helper function to convert MongoDB ObjectId to string
 def solution_helper(solution) -> dict:
@@ -21,10 +26,23 @@ def solution_helper(solution) -> dict:
         "id": str(solution["_id"]),
         "assignment_id": solution["assignment_id"],
         "answer_file": solution["answer_file"],
+        "answer_file_names": solution.get("answer_file_names", []),
         "answered_by": solution["answered_by"],
-        "submitted_on": solution["submitted_on"]
+        "submitted_on": solution["submitted_on"],
+        "version": solution.get("version", 0)  # For the ETag; not part of the response body
     }
 
+# Fields returned by solution views
+SOLUTION_FIELDS = ["assignment_id", "answer_file", "answer_file_names", "answered_by", "submitted_on", "version"]
+SOLUTION_EXPORT_FIELDS = ["assignment_id", "answer_file", "answered_by", "submitted_on"]
+
+# Helper function for exported solutions
+def solution_export_helper(solution) -> dict:
+    item = {"id": str(solution["_id"])}
+    for field in SOLUTION_EXPORT_FIELDS:
+        item[field] = solution.get(field)
+    return item
+
 # Create a new solution with file upload and form data
 @router.post("/", response_model=Solution)
 async def create_solution(
@@ -35,58 +53,169 @@ async def create_solution(
     if current_user["role"] not in ["helper", "admin"]:  # Helpers and Admins can post solutions
         raise HTTPException(status_code=403, detail="Only helpers and admins can post solutions.")
     
-    file_paths = []
+    file_paths, file_names = [], []
     
-    # Save uploaded answer files and store their paths
+    # Store uploaded answer files (deduplicated by content) and keep their paths
     if answer_file:
-        for file in answer_file:
-            file_path = os.path.join(SOLUTION_UPLOAD_DIR, file.filename)
-            with open(file_path, "wb") as f:
-                shutil.copyfileobj(file.file, f)
-            file_paths.append(file_path)  # Store file path
+        file_paths, file_names = await blob_store.save(answer_file, SOLUTION_UPLOAD_DIR)
 
     # Build Solution instance using form data and saved file paths
     solution = Solution(
         assignment_id=assignment_id,
         answer_file=file_paths,
+        answer_file_names=file_names,
         answered_by=current_user["username"],  # Attach current user
         submitted_on=datetime.utcnow()
     )
     
     # Convert solution model to dict and insert into database
     solution_dict = solution.dict()
-    new_solution = await solution_collection.insert_one(solution_dict)
-    created_solution = await solution_collection.find_one({"_id": new_solution.inserted_id})
+    created_solution = await solution_repository.insert(solution_dict)
+    await stats.record("solutions", added=[created_solution])
+
+    # Tell the assignment's creator a solution is waiting
+    if ObjectId.is_valid(assignment_id):
+        assignment = await assignment_repository.get(assignment_id, {"created_by": 1, "title": 1})
+        if assignment is not None and assignment["created_by"] != current_user["username"]:
+            notification_hub.publish(
+                [assignment["created_by"]],
+                f"{current_user['username']} posted a solution to \"{assignment['title']}\"",
+                event="solution.created",
+                assignment_id=assignment_id,
+            )
 
     return solution_helper(created_solution)
 
-# Get all solutions for a particular assignment
+# Get solutions for a particular assignment, newest first, one page at a time
 @router.get("/assignment/{assignment_id}", response_model=List[Solution])
 async def get_solutions_by_assignment(
     assignment_id: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Value of the previous page's X-Next-Cursor header"),
     current_user: dict = Depends(get_current_user)  # Get the current user
 ):
-    solutions = []
-    # Students can see solutions only for assignments they posted
-    if current_user["role"] == "student":
-        assignments = await assignments.find({"created_by": current_user["username"], "_id": ObjectId(assignment_id)}).to_list(None)
-        if not assignments:
+    if not ObjectId.is_valid(assignment_id):
+        raise HTTPException(status_code=400, detail="Invalid ID")
+    # Students (role "user") can see solutions only for assignments they posted
+    if current_user["role"] == "user":
+        assignment = await assignment_repository.get(assignment_id, {"created_by": 1})
+        if assignment is None or assignment.get("created_by") != current_user["username"]:
             raise HTTPException(status_code=403, detail="You are not authorized to view solutions for this assignment.")
-    
-    async for solution in solution_collection.find({"assignment_id": assignment_id}):
-        solutions.append(solution_helper(solution))
-    
-    return solutions
+
+    # No solution for this assignment changed since the client's copy
+    changed = await last_modified(f"solutions:{assignment_id}")
+    if changed:
+        if not_modified_since(request, changed):
+            return not_modified(last_modified=changed)
+        response.headers["Last-Modified"] = http_date(changed)
+
+    solutions, next_cursor = await paginate(
+        solution_repository.collection, {"assignment_id": assignment_id}, SOLUTION_FIELDS, limit, cursor, solution_helper
+    )
+    set_next_cursor(response, next_cursor)
+    return respond(solutions, Solution, response)
+
+# Download every solution file of an assignment as one streamed ZIP
+# (the assignment's creator and admins)
+@router.get("/assignment/{assignment_id}/bundle")
+async def download_solution_bundle(
+    assignment_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    if not ObjectId.is_valid(assignment_id):
+        raise HTTPException(status_code=400, detail="Invalid ID")
+    assignment = await assignment_repository.get(assignment_id, {"created_by": 1})
+    if assignment is None:
+        raise HTTPException(status_code=404, detail="Assignment not found")
+    if current_user["role"] != "admin" and assignment.get("created_by") != current_user["username"]:
+        raise HTTPException(status_code=403, detail="You are not authorized to download solutions for this assignment.")
+
+    solutions = await solution_repository.collection.find(
+        {"assignment_id": assignment_id}, {"answer_file": 1, "answer_file_names": 1, "answered_by": 1}
+    ).to_list(None)
+    entries = []
+    for solution in solutions:
+        files = solution.get("answer_file") or []
+        seen = set()
+        for index, path in enumerate(files):
+            name = stored_filename(files, solution.get("answer_file_names"), index)
+            # Two answer files may share a client filename
+            if name in seen:
+                name = f"{index}-{name}"
+            seen.add(name)
+            entries.append((f"{solution['answered_by']}/{solution['_id']}/{name}", path))
+    return zip_response(entries, f"solutions-{assignment_id}.zip")
+
+# Stream all matching solutions as NDJSON or CSV (admins only)
+@router.get("/export")
+async def export_solutions(
+    assignment_id: Optional[str] = Query(None),
+    answered_by: Optional[str] = Query(None),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = Query(False, description="Compress the export on the fly"),
+    current_user: dict = Depends(get_current_user)
+):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can export solutions.")
+    query = {}
+    if assignment_id:
+        query["assignment_id"] = assignment_id
+    if answered_by:
+        query["answered_by"] = answered_by
+    return export_response(
+        solution_repository.collection, query, SOLUTION_EXPORT_FIELDS, solution_export_helper, "solutions", format, gzip
+    )
 
 # Get a single solution by ID
 @router.get("/{id}", response_model=Solution)
-async def get_solution(id: str):
+async def get_solution(id: str, request: Request, response: Response):
     if not ObjectId.is_valid(id):
         raise HTTPException(status_code=400, detail="Invalid ID")
-    solution = await solution_collection.find_one({"_id": ObjectId(id)})
+
+    # Unchanged since the client's copy: answer from the version alone
+    if request.headers.get("if-none-match"):
+        version = await current_version(id, solution_repository, solution_cache)
+        if version is not None and etag_matches(request, make_etag(id, version)):
+            return not_modified(etag=make_etag(id, version))
+
+    async def load():
+        solution = await solution_repository.get(id)
+        return solution_helper(solution) if solution else None
+
+    # Served from the read-through cache; concurrent misses share one query
+    solution = await solution_cache.get(id, load)
     if solution is None:
         raise HTTPException(status_code=404, detail="Solution not found")
-    return solution_helper(solution)
+    response.headers["ETag"] = make_etag(id, solution["version"])
+    return respond(solution, Solution, response)
+
+# Download one answer file of a solution (supports HTTP Range); the
+# author, the assignment's creator and admins only, as for the bundle
+@router.get("/{id}/files/{index}")
+async def download_solution_file(
+    id: str,
+    index: int,
+    request: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    if not ObjectId.is_valid(id):
+        raise HTTPException(status_code=400, detail="Invalid ID")
+    solution = await solution_repository.get(id, {"answer_file": 1, "answer_file_names": 1, "answered_by": 1, "assignment_id": 1})
+    if solution is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    if current_user["role"] != "admin" and solution.get("answered_by") != current_user["username"]:
+        assignment_id = solution.get("assignment_id")
+        assignment = None
+        if assignment_id and ObjectId.is_valid(assignment_id):
+            assignment = await assignment_repository.get(assignment_id, {"created_by": 1})
+        if assignment is None or assignment.get("created_by") != current_user["username"]:
+            raise HTTPException(status_code=403, detail="You are not authorized to download this file.")
+    files = solution.get("answer_file") or []
+    if not 0 <= index < len(files):
+        raise HTTPException(status_code=404, detail="File not found")
+    return await file_response(request, files[index], stored_filename(files, solution.get("answer_file_names"), index))
 
 # Update a solution by ID (allows updating with new files)
 @router.put("/{id}", response_model=Solution)
@@ -106,20 +235,21 @@ async def update_solution(
     
     # Save uploaded answer files if any
     if answer_file:
-        solution_data["answer_file"] = []
-        for file in answer_file:
-            file_path = os.path.join(SOLUTION_UPLOAD_DIR, file.filename)
-            with open(file_path, "wb") as f:
-                shutil.copyfileobj(file.file, f)
-            solution_data["answer_file"].append(file_path)
-
-    # Update the solution in the database
-    update_result = await solution_collection.update_one({"_id": ObjectId(id)}, {"$set": solution_data})
+        solution_data["answer_file"], solution_data["answer_file_names"] = await blob_store.save(answer_file, SOLUTION_UPLOAD_DIR)
+
+    # Update the solution in the database, keeping the replaced file list
+    previous, updated_solution = await solution_repository.update_with_previous(id, solution_data)
     
-    if update_result.modified_count == 0:
+    if previous is None:
+        await blob_store.release(solution_data.get("answer_file"))
         raise HTTPException(status_code=404, detail="Solution not found")
+
+    # Drop references to the files this update replaced
+    if "answer_file" in solution_data:
+        await blob_store.release(previous.get("answer_file"))
+
+    await solution_cache.invalidate(id)
     
-    updated_solution = await solution_collection.find_one({"_id": ObjectId(id)})
     return solution_helper(updated_solution)
 
 # Delete a solution by ID
@@ -131,9 +261,14 @@ async def delete_solution(id: str, current_user: dict = Depends(get_current_user
     if not ObjectId.is_valid(id):
         raise HTTPException(status_code=400, detail="Invalid ID")
     
-    delete_result = await solution_collection.delete_one({"_id": ObjectId(id)})
+    deleted = await solution_repository.delete(id, projection={"answer_file": 1, "submitted_on": 1})
     
-    if delete_result.deleted_count == 0:
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Solution not found")
+
+    # Collect files no other solution references
+    await blob_store.release(deleted.get("answer_file"))
+    await solution_cache.invalidate(id)
+    await stats.record("solutions", removed=[deleted])
     
     return {"message": "Solution deleted successfully"}
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from services.auth import get_current_user
+from services.stats import stats
+
+router = APIRouter()
+
+def require_admin(current_user: dict):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can view statistics.")
+
+# Dashboard counts; per-day series cover the last `days` days
+@router.get("/")
+async def get_stats(
+    days: int = Query(30, ge=1, le=366),
+    current_user: dict = Depends(get_current_user)
+):
+    require_admin(current_user)
+    return await stats.dashboard(days)
+
+# Recompute every counter from the data now and report what drifted
+@router.post("/reconcile")
+async def reconcile_stats(
+    dry_run: bool = Query(False),
+    current_user: dict = Depends(get_current_user)
+):
+    require_admin(current_user)
+    drifted = await stats.reconcile(dry_run=dry_run)
+    return {"drifted": drifted}
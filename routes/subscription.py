@@ -0,0 +1,73 @@
+from fastapi import APIRouter, HTTPException, Depends, Form
+from models.Subscription import Subscription
+from bson import ObjectId
+from typing import Optional
+from datetime import datetime
+from services.auth import get_current_user
+from services.repository import subscription_repository
+from services.scheduler import deadline_scheduler
+
+router = APIRouter()
+
+# Helper function to convert MongoDB ObjectId to string
+def subscription_helper(subscription) -> dict:
+    return {
+        "id": str(subscription["_id"]),
+        "user_id": subscription["user_id"],
+        "plan": subscription["plan"],
+        "start_date": subscription["start_date"],
+        "end_date": subscription["end_date"],
+        "status": subscription["status"],
+    }
+
+# Create a subscription (admins may create one for another user)
+@router.post("/")
+async def create_subscription(
+    plan: str = Form(...),
+    end_date: datetime = Form(...),
+    start_date: Optional[datetime] = Form(None),
+    user_id: Optional[str] = Form(None),
+    current_user: dict = Depends(get_current_user)
+):
+    if user_id and user_id != current_user["username"] and current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can subscribe other users.")
+
+    subscription = Subscription(
+        user_id=user_id or current_user["username"],
+        plan=plan,
+        start_date=start_date or datetime.utcnow(),
+        end_date=end_date,
+    )
+    if subscription.end_date <= subscription.start_date:
+        raise HTTPException(status_code=400, detail="end_date must be after start_date")
+
+    created_subscription = await subscription_repository.insert(subscription.dict())
+    deadline_scheduler.schedule_subscription(created_subscription)
+
+    return subscription_helper(created_subscription)
+
+# Get the current user's subscriptions, newest first
+@router.get("/me", response_model=Optional[list])
+async def get_my_subscriptions(current_user: dict = Depends(get_current_user)):
+    subscriptions = await subscription_repository.collection.find(
+        {"user_id": current_user["username"]}
+    ).sort("_id", -1).to_list(100)
+    return [subscription_helper(subscription) for subscription in subscriptions]
+
+# Cancel an active subscription
+@router.post("/{id}/cancel")
+async def cancel_subscription(id: str, current_user: dict = Depends(get_current_user)):
+    if not ObjectId.is_valid(id):
+        raise HTTPException(status_code=400, detail="Invalid ID")
+    subscription = await subscription_repository.get(id, {"user_id": 1, "status": 1})
+    if subscription is None:
+        raise HTTPException(status_code=404, detail="Subscription not found")
+    if subscription["user_id"] != current_user["username"] and current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="You can only cancel your own subscriptions.")
+    if subscription["status"] != "active":
+        raise HTTPException(status_code=409, detail="Subscription is not active")
+
+    cancelled = await subscription_repository.update(id, {"status": "cancelled"})
+    deadline_scheduler.schedule_subscription(cancelled)
+
+    return subscription_helper(cancelled)
@@ -0,0 +1,92 @@
+from fastapi import APIRouter, HTTPException, Depends, Form, Header, Request, Response
+from bson import ObjectId
+from services.auth import get_current_user
+from services.blob_store import blob_store, original_filename
+from services.resumable import resumable_uploads
+from services.repository import assignment_repository, solution_repository
+from services.read_cache import assignment_cache, solution_cache
+from routes.assignment import UPLOAD_DIR
+from routes.solution import SOLUTION_UPLOAD_DIR
+
+router = APIRouter()
+
+# Where finalized uploads go, per target kind: directory, repository,
+# path field, filename field, cache
+UPLOAD_TARGETS = {
+    "assignment": (UPLOAD_DIR, assignment_repository, "files", "file_names", assignment_cache),
+    "solution": (SOLUTION_UPLOAD_DIR, solution_repository, "answer_file", "answer_file_names", solution_cache),
+}
+
+# Helper function to describe a session
+def session_helper(session) -> dict:
+    return {
+        "id": session["_id"],
+        "filename": session["filename"],
+        "size": session["size"],
+        "offset": session["offset"],
+        "expires_at": session["expires_at"],
+    }
+
+# Start a resumable upload
+@router.post("/", status_code=201)
+async def create_upload(
+    response: Response,
+    filename: str = Form(...),
+    size: int = Form(..., ge=0),
+    current_user: dict = Depends(get_current_user)
+):
+    session = await resumable_uploads.create(current_user["username"], filename, size)
+    response.headers["Location"] = f"/uploads/{session['_id']}"
+    response.headers["Upload-Offset"] = "0"
+    return session_helper(session)
+
+# Current offset of an upload, to resume after a failure
+@router.get("/{id}")
+async def get_upload(id: str, response: Response, current_user: dict = Depends(get_current_user)):
+    session = await resumable_uploads.get(id, current_user["username"])
+    response.headers["Upload-Offset"] = str(session["offset"])
+    return session_helper(session)
+
+# Append the request body at Upload-Offset
+@router.patch("/{id}")
+async def upload_chunk(
+    id: str,
+    request: Request,
+    response: Response,
+    upload_offset: int = Header(..., ge=0),
+    current_user: dict = Depends(get_current_user)
+):
+    offset = await resumable_uploads.append(id, current_user["username"], upload_offset, request.stream())
+    response.headers["Upload-Offset"] = str(offset)
+    return {"id": id, "offset": offset}
+
+# Attach a completed upload to an existing assignment or solution
+@router.post("/{id}/finalize")
+async def finalize_upload(
+    id: str,
+    kind: str = Form(..., pattern="^(assignment|solution)$"),
+    target_id: str = Form(...),
+    current_user: dict = Depends(get_current_user)
+):
+    if not ObjectId.is_valid(target_id):
+        raise HTTPException(status_code=400, detail="Invalid ID")
+    directory, repository, field, names_field, cache = UPLOAD_TARGETS[kind]
+    if await repository.get(target_id, {"_id": 1}) is None:
+        raise HTTPException(status_code=404, detail=f"{kind.capitalize()} not found")
+
+    stored = await resumable_uploads.complete(
+        id, current_user["username"], directory, lambda item: blob_store.commit(item, directory)
+    )
+    path = stored.path
+    if await repository.push(target_id, {field: path, names_field: original_filename(stored.filename)}) is None:
+        await blob_store.release([path])
+        raise HTTPException(status_code=404, detail=f"{kind.capitalize()} not found")
+
+    await cache.invalidate(target_id)
+    return {"kind": kind, "id": target_id, "file": path}
+
+# Abandon an upload
+@router.delete("/{id}")
+async def delete_upload(id: str, current_user: dict = Depends(get_current_user)):
+    await resumable_uploads.abort(id, current_user["username"])
+    return {"message": "Upload deleted successfully"}
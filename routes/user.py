@@ -1,18 +1,28 @@
-from fastapi import APIRouter, HTTPException, Form
+from fastapi import APIRouter, HTTPException, Depends, File, Form, Query, Request, Response, UploadFile
 from models.UserRegister import RoleEnum, UserRegistration, UserRegistrationResponse
-from database import user_collection
-from passlib.context import CryptContext
+from models.UserProfile import UserProfile
+from services.passwords import password_hasher, HasherBusyError
+from services.auth import get_current_user, invalidate_user
+from services.bulk import BULK_BATCH_SIZE, MAX_BULK_BATCH_SIZE, detect_format, ingest
+from services.repository import user_repository
+from services.responses import respond
+from services.conditional import current_version, etag_matches, http_date, last_modified, make_etag, not_modified, not_modified_since
+from services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate, set_next_cursor
+from services.help_queue import skill_index
+from services.stats import stats
+from database import profile_collection
 from bson import ObjectId
-from typing import Optional
+from pymongo.errors import DuplicateKeyError
+from typing import List, Optional
 
 router = APIRouter()
 
-# Password hasher
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-# Helper function to hash passwords
-def hash_password(password: str):
-    return pwd_context.hash(password)
+# Helper function to hash passwords (runs on the shared hashing pool)
+async def hash_password(password: str):
+    try:
+        return await password_hasher.hash(password)
+    except HasherBusyError:
+        raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
 
 # Helper function to convert MongoDB ObjectId to string
 def user_helper(user) -> dict:
@@ -25,6 +35,16 @@ def user_helper(user) -> dict:
         "gender": user["gender"]
     }
 
+# Map a unique index violation (see indexes.py) to the API error
+def duplicate_user_error(error: DuplicateKeyError) -> HTTPException:
+    key_pattern = (error.details or {}).get("keyPattern", {})
+    if "email" in key_pattern:
+        return HTTPException(status_code=400, detail="Email already registered")
+    return HTTPException(status_code=400, detail="Username already exists")
+
+# Fields returned by user views (never the password hash)
+USER_FIELDS = ["FullName", "username", "email", "role", "gender"]
+
 # Register a new user
 @router.post("/register", response_model=UserRegistrationResponse)
 async def register_user(
@@ -35,14 +55,8 @@ async def register_user(
     role: RoleEnum = Form(...),
     gender: str = Form(...)
 ):
-    # Check if username or email already exists
-    if await user_collection.find_one({"username": username}):
-        raise HTTPException(status_code=400, detail="Username already exists")
-    if await user_collection.find_one({"email": email}):
-        raise HTTPException(status_code=400, detail="Email already registered")
-
     # Hash the password
-    hashed_password = hash_password(password)
+    hashed_password = await hash_password(password)
 
     # Create the user object
     user = {
@@ -54,9 +68,12 @@ async def register_user(
         "gender": gender
     }
 
-    # Insert the user into the database
-    new_user = await user_collection.insert_one(user)
-    created_user = await user_collection.find_one({"_id": new_user.inserted_id})
+    # Insert the user into the database; unique indexes reject duplicates
+    try:
+        created_user = await user_repository.insert(user)
+    except DuplicateKeyError as e:
+        raise duplicate_user_error(e)
+    await stats.record("users", added=[created_user])
 
     # Return the response using UserRegistrationResponse
     return UserRegistrationResponse(
@@ -68,30 +85,77 @@ async def register_user(
         gender=created_user["gender"]
     )
 
+# Import many users from an NDJSON or CSV file (admins only)
+@router.post("/bulk")
+async def bulk_register_users(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+    batch_size: int = Query(BULK_BATCH_SIZE, ge=1, le=MAX_BULK_BATCH_SIZE),
+    current_user: dict = Depends(get_current_user)
+):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can import users.")
+
+    # Hash the batch's passwords in parallel on the shared hashing pool
+    async def prepare(users):
+        hashed_passwords = await password_hasher.hash_many([user.password for user in users])
+        documents = []
+        for user, hashed_password in zip(users, hashed_passwords):
+            document = user.dict()
+            document["password"] = hashed_password  # Store hashed password
+            documents.append(document)
+        return documents
+
+    # Count each batch's inserted rows as it is written
+    async def inserted(documents):
+        await stats.record("users", added=documents)
+
+    return await ingest(file, detect_format(file, format), UserRegistration, user_repository, prepare, batch_size, inserted)
+
 # Add the remaining routes here (get_user, get_users, update_user, delete_user)
 
 
 
 # Get user by ID
-@router.get("/{id}", response_model=UserRegistration)
-async def get_user(id: str):
+@router.get("/{id}", response_model=UserRegistrationResponse)
+async def get_user(id: str, request: Request, response: Response):
     if not ObjectId.is_valid(id):
         raise HTTPException(status_code=400, detail="Invalid ID")
-    user = await user_collection.find_one({"_id": ObjectId(id)})
+
+    # Unchanged since the client's copy: answer from the version alone
+    if request.headers.get("if-none-match"):
+        version = await current_version(id, user_repository)
+        if version is not None and etag_matches(request, make_etag(id, version)):
+            return not_modified(etag=make_etag(id, version))
+    user = await user_repository.get(id, {"password": 0})
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return user_helper(user)
+    response.headers["ETag"] = make_etag(id, user.get("version", 0))
+    return respond(user_helper(user), UserRegistrationResponse, response)
 
-# Get all users
+# Get users, newest first, one page at a time
 @router.get("/", response_model=Optional[list])
-async def get_users():
-    users = []
-    async for user in user_collection.find():
-        users.append(user_helper(user))
-    return users
+async def get_users(
+    request: Request,
+    response: Response,
+    role: Optional[RoleEnum] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Value of the previous page's X-Next-Cursor header"),
+):
+    # No user was created, updated or deleted since the client's copy
+    changed = await last_modified("users")
+    if changed:
+        if not_modified_since(request, changed):
+            return not_modified(last_modified=changed)
+        response.headers["Last-Modified"] = http_date(changed)
+
+    query = {"role": role} if role else {}
+    users, next_cursor = await paginate(user_repository.collection, query, USER_FIELDS, limit, cursor, user_helper)
+    set_next_cursor(response, next_cursor)
+    return respond(users, response=response)
 
 # Update user by ID
-@router.put("/{id}", response_model=UserRegistration)
+@router.put("/{id}", response_model=UserRegistrationResponse)
 async def update_user(
     id: str,
     FullName: Optional[str] = Form(None),
@@ -109,39 +173,78 @@ async def update_user(
     if FullName:
         update_data["FullName"] = FullName
     if username:
-        # Ensure new username is unique
-        if await user_collection.find_one({"username": username}):
-            raise HTTPException(status_code=400, detail="Username already exists")
         update_data["username"] = username
     if email:
-        # Ensure new email is unique
-        if await user_collection.find_one({"email": email}):
-            raise HTTPException(status_code=400, detail="Email already registered")
         update_data["email"] = email
     if password:
-        hashed_password = hash_password(password)
+        hashed_password = await hash_password(password)
         update_data["password"] = hashed_password
     if role:
         update_data["role"] = role
     if gender:
         update_data["gender"] = gender
 
-    # Update the user in the database
-    update_result = await user_collection.update_one({"_id": ObjectId(id)}, {"$set": update_data})
-    if update_result.modified_count == 0:
+    # Update the user in the database; unique indexes reject duplicates
+    try:
+        previous, updated_user = await user_repository.update_with_previous(id, update_data)
+    except DuplicateKeyError as e:
+        raise duplicate_user_error(e)
+    if updated_user is None:
         raise HTTPException(status_code=404, detail="User not found")
+    if role:
+        await stats.record("users", added=[updated_user], removed=[previous])
+
+    # Drop the cached principal so the next request sees the change
+    invalidate_user(user_id=id)
 
-    updated_user = await user_collection.find_one({"_id": ObjectId(id)})
     return user_helper(updated_user)
 
+# Get a user's profile
+@router.get("/{id}/profile", response_model=UserProfile)
+async def get_user_profile(id: str):
+    if not ObjectId.is_valid(id):
+        raise HTTPException(status_code=400, detail="Invalid ID")
+    profile = await profile_collection.find_one({"user_id": id}, {"_id": 0})
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+# Create or replace a user's profile; skills drive help-request matching
+@router.put("/{id}/profile", response_model=UserProfile)
+async def update_user_profile(
+    id: str,
+    bio: Optional[str] = Form(None),
+    profile_picture: Optional[str] = Form(None),
+    skills: List[str] = Form([]),
+):
+    if not ObjectId.is_valid(id):
+        raise HTTPException(status_code=400, detail="Invalid ID")
+    if await user_repository.get(id, {"_id": 1}) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # Accept both repeated fields and a comma-separated list
+    skills = [skill.strip() for value in skills for skill in value.split(",") if skill.strip()]
+    profile = UserProfile(user_id=id, bio=bio, profile_picture=profile_picture, skills=skills)
+    await profile_collection.replace_one({"user_id": id}, profile.dict(), upsert=True)
+
+    # Match new help requests against the new skills right away
+    skill_index.update(id, profile.skills)
+
+    return profile
+
 # Delete user by ID
 @router.delete("/{id}")
 async def delete_user(id: str):
     if not ObjectId.is_valid(id):
         raise HTTPException(status_code=400, detail="Invalid ID")
-    delete_result = await user_collection.delete_one({"_id": ObjectId(id)})
+    deleted = await user_repository.delete(id, projection={"role": 1})
     
-    if delete_result.deleted_count == 0:
+    if deleted is None:
         raise HTTPException(status_code=404, detail="User not found")
+
+    invalidate_user(user_id=id)
+    await profile_collection.delete_one({"user_id": id})
+    skill_index.update(id, None)
+    await stats.record("users", removed=[deleted])
     
     return {"message": "User deleted successfully"}
@@ -0,0 +1,70 @@
+"""Production entrypoint: N uvicorn workers sharing one listening socket.
+
+    python serve.py [--workers N] [--host 0.0.0.0] [--port 8000]
+
+Workers default to WEB_CONCURRENCY, else the CPUs this process may use
+(affinity mask and cgroup quota). Every worker is a fresh process that
+opens its own Mongo client in the app lifespan; see DEPLOYMENT.md for
+what is per worker and what is shared.
+
+Signals to the parent process:
+    SIGHUP   rolling restart: one worker at a time drains and is replaced,
+             picking up new code, while the others keep serving
+    SIGTERM  graceful stop: stop accepting, drain in-flight requests
+    SIGTTIN / SIGTTOU  add / remove a worker
+"""
+import argparse
+import math
+import os
+
+import uvicorn
+
+# Longest an in-flight request (e.g. a large upload) may take to finish
+# once its worker is told to stop
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "120"))
+KEEPALIVE_TIMEOUT = int(os.getenv("KEEPALIVE_TIMEOUT", "5"))
+
+
+def available_cpus() -> int:
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    # A container CPU limit (cgroup v2) is stricter than the visible cores
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "0")) or available_cpus())
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    args = parser.parse_args()
+
+    # Each worker sizes its own password hashing pool; split the CPUs between
+    # them instead of every worker starting one thread per core
+    os.environ.setdefault("PASSWORD_HASH_WORKERS", str(max(2, available_cpus() // args.workers)))
+
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        lifespan="on",
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+        timeout_keep_alive=KEEPALIVE_TIMEOUT,
+        proxy_headers=True,
+        forwarded_allow_ips=os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+    )
+
+
+if __name__ == "__main__":
+    main()
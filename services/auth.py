@@ -0,0 +1,87 @@
+import os
+import time
+from fastapi import Depends, HTTPException
+from fastapi.security import OAuth2PasswordBearer
+from bson import ObjectId
+from database import user_collection
+from services.cache import TTLCache
+from services.security import ACCESS_TOKEN_EXPIRE_MINUTES, InvalidTokenError, verify_token
+
+# Auth cache configuration
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "30"))
+
+# OAuth2PasswordBearer to get the token
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
+
+# Decoded token payloads keyed by the raw bearer token
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+# Resolved users keyed by the token "sub" (username)
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL)
+
+credentials_exception = HTTPException(
+    status_code=401,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+
+# Function to convert MongoDB document to a dictionary and handle ObjectId
+def user_to_dict(user):
+    user_dict = {k: (str(v) if isinstance(v, ObjectId) else v) for k, v in user.items()}
+    return user_dict
+
+
+# Decode a token, skipping signature verification for tokens seen recently
+def decode_token(token: str) -> dict:
+    payload = token_cache.get(token)
+    if payload is not None:
+        if payload.get("exp", 0) > time.time():
+            return payload
+        token_cache.pop(token)
+
+    try:
+        payload = verify_token(token)
+    except InvalidTokenError:
+        raise credentials_exception
+
+    if payload.get("sub") is None or payload.get("role") is None:
+        raise credentials_exception
+
+    # Never keep a payload around past its own expiry
+    if "exp" in payload:
+        ttl = payload["exp"] - time.time()
+        if ttl > 0:
+            token_cache.set(token, payload, ttl=min(ttl, token_cache.ttl))
+    return payload
+
+
+# Drop cached principals for a user after it is changed or deleted
+def invalidate_user(user_id: str = None, username: str = None):
+    if username is not None:
+        principal_cache.pop(username)
+    if user_id is not None:
+        principal_cache.invalidate_where(lambda user: user.get("_id") == str(user_id))
+
+
+# Get current user
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    payload = decode_token(token)
+    username: str = payload["sub"]
+
+    user = principal_cache.get(username)
+    if user is not None:
+        return user
+
+    user = await user_collection.find_one({"username": username})
+    if user is None:
+        raise credentials_exception
+    user = user_to_dict(user)  # Convert the user object to dict
+    principal_cache.set(username, user)
+    return user
+
+
+def auth_metrics() -> dict:
+    return {"token_cache": token_cache.stats(), "principal_cache": principal_cache.stats()}
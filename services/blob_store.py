@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime
+from typing import List, Optional, Tuple
+from fastapi import UploadFile
+from pymongo import ReturnDocument
+from database import blob_collection
+from services.storage import StoredFile, UploadStorage, upload_storage, remove_quietly
+
+logger = logging.getLogger(__name__)
+
+LOCK_STRIPES = 64
+
+
+# Content-addressed file store. Each unique content is written once as
+# <directory>/<digest[:2]>/<digest> and reference counted in the "blobs"
+# collection; the paths are what Assignment.files and Solution.answer_file
+# hold. The client filename belongs to the reference, not the content, so
+# documents keep it alongside (file_names / answer_file_names).
+class BlobStore:
+    def __init__(self, collection=blob_collection, storage: UploadStorage = upload_storage):
+        self.collection = collection
+        self.storage = storage
+        # Serialises acquire/release of the same blob within this process;
+        # other workers are handled by _collect re-checking the document
+        self._locks = [asyncio.Lock() for _ in range(LOCK_STRIPES)]
+
+        # Metrics
+        self.blobs_written = 0
+        self.deduplicated = 0
+        self.bytes_saved = 0
+        self.blobs_collected = 0
+
+    def _lock(self, path: str) -> asyncio.Lock:
+        return self._locks[hash(path) % LOCK_STRIPES]
+
+    @staticmethod
+    def blob_path(directory: str, digest: str) -> str:
+        return os.path.join(directory, digest[:2], digest)
+
+    # Store uploads and take one reference per file; returns the blob paths
+    # and the client filenames, in input order
+    async def save(self, files: List[UploadFile], directory: str) -> Tuple[List[str], List[str]]:
+        stored = await self.storage.stream(files, directory)
+        paths = [await self.commit(item, directory) for item in stored]
+        return paths, [original_filename(item.filename) for item in stored]
+
+    # Move an already written and hashed temp file into the store and take
+    # one reference to it; returns the blob path
+    async def commit(self, item: StoredFile, directory: str) -> str:
+        path = self.blob_path(directory, item.digest)
+        async with self._lock(path):
+            await self.collection.update_one(
+                {"_id": path},
+                {
+                    "$inc": {"refcount": 1},
+                    "$setOnInsert": {"digest": item.digest, "size": item.size, "created_at": datetime.utcnow()},
+                },
+                upsert=True,
+            )
+            if await asyncio.to_thread(os.path.exists, path):
+                await asyncio.to_thread(remove_quietly, item.path)
+                self.deduplicated += 1
+                self.bytes_saved += item.size
+            else:
+                await asyncio.to_thread(os.makedirs, os.path.dirname(path), exist_ok=True)
+                await asyncio.to_thread(os.replace, item.path, path)
+                self.blobs_written += 1
+        item.path = path
+        self.storage.record(item)
+        return path
+
+    # Drop one reference per path and delete blobs nobody references anymore.
+    # Paths not managed by the store (legacy name-based files) are ignored.
+    async def release(self, paths: Optional[List[str]]):
+        for path in paths or []:
+            async with self._lock(path):
+                blob = await self.collection.find_one_and_update(
+                    {"_id": path},
+                    {"$inc": {"refcount": -1}},
+                    return_document=ReturnDocument.AFTER,
+                )
+                if blob is not None and blob["refcount"] <= 0:
+                    await self._collect(path)
+
+    # Another worker may commit the same content between the delete and the
+    # unlink, so the file is moved aside first and put back if a new
+    # reference appeared meanwhile (copies of one digest are identical)
+    async def _collect(self, path: str):
+        deleted = await self.collection.delete_one({"_id": path, "refcount": {"$lte": 0}})
+        if not deleted.deleted_count:
+            return
+        tombstone = f"{path}.{uuid.uuid4().hex}.deleted"
+        try:
+            await asyncio.to_thread(os.rename, path, tombstone)
+        except FileNotFoundError:
+            return
+        if await self.collection.find_one({"_id": path}, {"_id": 1}) is not None:
+            await asyncio.to_thread(os.replace, tombstone, path)
+            return
+        await asyncio.to_thread(remove_quietly, tombstone)
+        self.blobs_collected += 1
+        logger.info("Collected unreferenced blob %s", path)
+
+    # Sweep blobs left at zero references (e.g. by a crash between steps)
+    async def collect_garbage(self) -> int:
+        collected = self.blobs_collected
+        async for blob in self.collection.find({"refcount": {"$lte": 0}}, {"_id": 1}):
+            async with self._lock(blob["_id"]):
+                await self._collect(blob["_id"])
+        return self.blobs_collected - collected
+
+    def metrics(self) -> dict:
+        return {
+            "blobs_written": self.blobs_written,
+            "deduplicated": self.deduplicated,
+            "bytes_saved": self.bytes_saved,
+            "blobs_collected": self.blobs_collected,
+        }
+
+
+def original_filename(filename: Optional[str]) -> str:
+    return os.path.basename(filename or "") or "file"
+
+
+# Download name of the index-th file of a document. Files stored before
+# names were kept have none (their paths end in the client filename); they
+# come first, as later files are only ever appended.
+def stored_filename(paths: List[str], names: Optional[List[str]], index: int) -> str:
+    unnamed = len(paths) - len(names or [])
+    if index >= unnamed:
+        return names[index - unnamed]
+    return os.path.basename(paths[index])
+
+
+# Single instance shared by the assignment and solution routes
+blob_store = BlobStore()
@@ -0,0 +1,145 @@
+import codecs
+import csv
+import json
+import os
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple, Type
+from fastapi import HTTPException, UploadFile
+from pydantic import BaseModel, ValidationError
+from pymongo.errors import BulkWriteError
+
+# Rows validated and written per insert_many call
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+MAX_BULK_BATCH_SIZE = int(os.getenv("MAX_BULK_BATCH_SIZE", "5000"))
+BULK_READ_CHUNK_SIZE = 64 * 1024
+
+
+# Pick the row format from the query, the filename or the content type
+def detect_format(file: UploadFile, format: str = None) -> str:
+    if format:
+        return format
+    name = (file.filename or "").lower()
+    if name.endswith(".csv") or (file.content_type or "").startswith("text/csv"):
+        return "csv"
+    return "ndjson"
+
+
+# Decode the upload incrementally and yield it line by line, each ending
+# in "\n" ("\r\n" is normalised). Only "\n" ends a line: str.splitlines
+# would also split on characters such as U+2028 or \x0c that are valid
+# inside JSON strings and quoted CSV fields.
+async def iter_lines(file: UploadFile) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    while True:
+        chunk = await file.read(BULK_READ_CHUNK_SIZE)
+        pending += decoder.decode(chunk, final=not chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.removesuffix("\r") + "\n"
+        if not chunk:
+            break
+    if pending:
+        yield pending.removesuffix("\r")
+
+
+# Yield (row number, raw dict) for every row of an NDJSON or CSV upload;
+# rows that are not valid JSON objects are yielded as errors (a string)
+async def iter_rows(file: UploadFile, format: str) -> AsyncIterator[Tuple[int, object]]:
+    if format == "csv":
+        header = None
+        buffered = []
+        quotes = 0
+        row_number = 0
+        async for line in iter_lines(file):
+            buffered.append(line)
+            # An odd number of quotes so far means a quoted field spans lines
+            quotes += line.count('"')
+            if quotes % 2:
+                continue
+            records = list(csv.reader(buffered))
+            buffered = []
+            quotes = 0
+            for record in records:
+                if header is None:
+                    header = record
+                    continue
+                if not any(record):
+                    continue
+                row_number += 1
+                # Empty cells mean "not given" so model defaults apply
+                yield row_number, {key: value for key, value in zip(header, record) if value != ""}
+        return
+
+    row_number = 0
+    async for line in iter_lines(file):
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield row_number, f"Invalid JSON: {e}"
+            continue
+        yield row_number, row if isinstance(row, dict) else "Each line must be a JSON object"
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in error.errors())
+
+
+# Validate rows with `model`, turn each batch into documents with
+# `prepare` and write it with one unordered insert_many, then hand the
+# documents that were inserted to `inserted` (e.g. counters). Only one
+# batch is held at a time. Returns a per-row report.
+async def ingest(
+    file: UploadFile,
+    format: str,
+    model: Type[BaseModel],
+    repository,
+    prepare: Callable[[List[BaseModel]], Awaitable[List[dict]]],
+    batch_size: int = BULK_BATCH_SIZE,
+    inserted: Optional[Callable[[List[dict]], Awaitable[None]]] = None,
+) -> dict:
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+
+    results = []
+    batch = []
+
+    async def flush():
+        if not batch:
+            return
+        rows = [row_number for row_number, _ in batch]
+        documents = await prepare([item for _, item in batch])
+        errors = {}
+        try:
+            await repository.insert_many(documents)
+        except BulkWriteError as e:
+            for write_error in e.details.get("writeErrors", []):
+                errors[write_error["index"]] = write_error.get("errmsg", "Write failed")
+        written = []
+        for index, (row_number, document) in enumerate(zip(rows, documents)):
+            if index in errors:
+                results.append({"row": row_number, "error": errors[index]})
+            else:
+                results.append({"row": row_number, "id": str(document["_id"])})
+                written.append(document)
+        batch.clear()
+        if inserted is not None and written:
+            await inserted(written)
+
+    async for row_number, row in iter_rows(file, format):
+        if isinstance(row, str):
+            results.append({"row": row_number, "error": row})
+            continue
+        try:
+            batch.append((row_number, model(**row)))
+        except ValidationError as e:
+            results.append({"row": row_number, "error": _validation_message(e)})
+        if len(batch) >= batch_size:
+            await flush()
+    await flush()
+
+    results.sort(key=lambda result: result["row"])
+    created = sum(1 for result in results if "id" in result)
+    return {"created": created, "failed": len(results) - created, "rows": results}
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Optional
+from fastapi import Request, Response
+from pymongo import UpdateOne
+from database import change_collection
+
+logger = logging.getLogger(__name__)
+
+# Seconds between writes of buffered scope changes; other workers may serve
+# the previous Last-Modified for up to this long after a write
+CHANGE_FLUSH_INTERVAL = float(os.getenv("CHANGE_FLUSH_INTERVAL", "0.2"))
+
+
+# Strong ETag from the document id and its version counter
+def make_etag(id, version: Optional[int]) -> str:
+    return f'"{id}-{version or 0}"'
+
+
+# If-None-Match uses weak comparison, so W/ prefixes are ignored
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or etag in [tag[2:] if tag.startswith("W/") else tag for tag in candidates]
+
+
+def http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value, usegmt=True)
+
+
+# True when the client's If-Modified-Since copy is still current
+def not_modified_since(request: Request, last_modified: datetime) -> bool:
+    header = request.headers.get("if-modified-since")
+    if not header or request.headers.get("if-none-match"):
+        return False
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    # HTTP dates have one second resolution
+    return last_modified.replace(microsecond=0) <= since
+
+
+def not_modified(etag: Optional[str] = None, last_modified: Optional[datetime] = None) -> Response:
+    headers = {}
+    if etag:
+        headers["ETag"] = etag
+    if last_modified:
+        headers["Last-Modified"] = http_date(last_modified)
+    return Response(status_code=304, headers=headers)
+
+
+# Version of a document for If-None-Match: taken from the read cache when
+# it is there, otherwise an _id lookup that only returns the version
+async def current_version(id: str, repository, cache=None) -> Optional[int]:
+    if cache is not None:
+        cached = await cache.peek(id)
+        if cached is not None:
+            return cached.get("version", 0)
+    return await repository.get_version(id)
+
+
+# Last change time per list scope (e.g. "assignments"). Writes only note
+# the scope in memory; a background task upserts everything noted since
+# the last flush in one bulk write, so the write paths keep their single
+# round trip. Reads in this worker also see what is still buffered.
+class ChangeLog:
+    def __init__(self, collection=change_collection):
+        self.collection = collection
+        self._pending = {}  # scope -> latest change not yet written
+        self._in_flight = {}  # the batch the current flush is writing
+        self._flush_lock = asyncio.Lock()
+
+        # Metrics
+        self.touches = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+
+    def _note(self, scope: str, when: datetime):
+        if scope not in self._pending or self._pending[scope] < when:
+            self._pending[scope] = when
+
+    # Record that something in each scope changed at `when`
+    def touch(self, scopes: Iterable[str], when: datetime):
+        for scope in scopes:
+            self._note(scope, when)
+        self.touches += 1
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            # changed_at() keeps seeing the batch until Mongo has it
+            batch, self._pending = self._pending, {}
+            self._in_flight = batch
+            try:
+                await self.collection.bulk_write(
+                    [UpdateOne({"_id": scope}, {"$max": {"updated_at": when}}, upsert=True) for scope, when in batch.items()],
+                    ordered=False,
+                )
+                self.flushes += 1
+            except Exception:
+                # Keep the changes for the next flush rather than losing them
+                self.failed_flushes += 1
+                for scope, when in batch.items():
+                    self._note(scope, when)
+                logger.exception("Persisting %d scope changes failed", len(batch))
+            finally:
+                self._in_flight = {}
+
+    # Background task started from the application lifespan
+    async def run_flusher(self, interval: float = CHANGE_FLUSH_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+    # Latest change not yet in Mongo: pending or being written
+    def _unwritten(self, scope: str) -> Optional[datetime]:
+        times = [when for when in (self._pending.get(scope), self._in_flight.get(scope)) if when is not None]
+        return max(times) if times else None
+
+    async def changed_at(self, scope: str) -> Optional[datetime]:
+        # Looked at before the read too: a flush may finish while it runs
+        before = self._unwritten(scope)
+        change = await self.collection.find_one({"_id": scope})
+        times = [when for when in (change["updated_at"] if change else None, before, self._unwritten(scope)) if when is not None]
+        return max(times) if times else None
+
+    def metrics(self) -> dict:
+        return {
+            "touches": self.touches,
+            "pending": len(self._pending) + len(self._in_flight),
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+# Single instance shared by the repositories and the list routes
+change_log = ChangeLog()
+
+
+# Record that something in each scope (e.g. "assignments") changed
+def touch(scopes: Iterable[str], when: datetime):
+    change_log.touch(scopes, when)
+
+
+# Time of the last create/update/delete in a scope as an HTTP validator:
+# rounded up to the whole second, and None while that second is still
+# running, since a later write in the same second would get the same date
+async def last_modified(scope: str) -> Optional[datetime]:
+    changed = await change_log.changed_at(scope)
+    if changed is None:
+        return None
+    if changed.microsecond:
+        changed = changed.replace(microsecond=0) + timedelta(seconds=1)
+    return changed if changed <= datetime.utcnow() else None
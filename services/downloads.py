@@ -0,0 +1,147 @@
+import asyncio
+import mimetypes
+import os
+import re
+import time
+import unicodedata
+import zipfile
+from typing import AsyncIterator, Iterable, Optional, Tuple
+from urllib.parse import quote
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+
+# Formats that are already compressed; deflating them again only costs CPU
+STORED_EXTENSIONS = {
+    ".xlsx", ".xlsm", ".docx", ".pptx", ".odt", ".ods", ".odp", ".pdf", ".zip", ".gz", ".bz2",
+    ".xz", ".7z", ".rar", ".jpg", ".jpeg", ".png", ".gif", ".webp", ".mp3", ".mp4", ".mov", ".avi",
+}
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Characters an ASCII filename= fallback must not carry
+UNSAFE_FILENAME = re.compile(r'[^\x20-\x7e]|["\\]')
+
+
+# Content-Disposition for a client filename: headers are latin-1, so send
+# the name as RFC 5987 filename* with a plain ASCII filename= fallback
+def content_disposition(filename: str) -> str:
+    # Drop accents ("é" -> "e"), replace whatever is still not plain ASCII
+    fallback = "".join(c for c in unicodedata.normalize("NFKD", filename) if not unicodedata.combining(c))
+    fallback = UNSAFE_FILENAME.sub("_", fallback).strip() or "download"
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+async def iter_file(path: str, start: int = 0, length: Optional[int] = None) -> AsyncIterator[bytes]:
+    handle = await asyncio.to_thread(open, path, "rb")
+    try:
+        await asyncio.to_thread(handle.seek, start)
+        remaining = length
+        while remaining is None or remaining > 0:
+            size = DOWNLOAD_CHUNK_SIZE if remaining is None else min(DOWNLOAD_CHUNK_SIZE, remaining)
+            chunk = await asyncio.to_thread(handle.read, size)
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+    finally:
+        await asyncio.to_thread(handle.close)
+
+
+# Parse a single "bytes=" range; None means serve the whole file
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    if not header:
+        return None
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None  # Multiple or malformed ranges: ignore, send everything
+    first, last = match.groups()
+    if first == "":
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+# Serve one stored file, honouring a single HTTP Range
+async def file_response(request: Request, path: str, filename: str) -> StreamingResponse:
+    try:
+        size = (await asyncio.to_thread(os.stat, path)).st_size
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    headers = {"Accept-Ranges": "bytes", "Content-Disposition": content_disposition(filename)}
+    byte_range = parse_range(request.headers.get("range"), size)
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(iter_file(path), media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(iter_file(path, start, end - start + 1), status_code=206, media_type=media_type, headers=headers)
+
+
+# Write-only sink that hands what zipfile wrote back to the generator
+class _ZipSink:
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+# Build a ZIP on the fly from (archive name, path) pairs; no temp archive.
+# Missing files are skipped.
+async def iter_zip(entries: Iterable[Tuple[str, str]]) -> AsyncIterator[bytes]:
+    sink = _ZipSink()
+    archive = zipfile.ZipFile(sink, mode="w", allowZip64=True)
+    for name, path in entries:
+        if not await asyncio.to_thread(os.path.exists, path):
+            continue
+        # Blob paths carry no extension; the archive name is the client's filename
+        compression = zipfile.ZIP_STORED if os.path.splitext(name)[1].lower() in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+        info = zipfile.ZipInfo(name, date_time=_mtime(path))
+        info.compress_type = compression
+        entry = archive.open(info, mode="w", force_zip64=True)
+        async for chunk in iter_file(path):
+            await asyncio.to_thread(entry.write, chunk)
+            data = sink.drain()
+            if data:
+                yield data
+        await asyncio.to_thread(entry.close)
+        yield sink.drain()
+    archive.close()
+    yield sink.drain()
+
+
+def _mtime(path: str) -> tuple:
+    return time.localtime(os.path.getmtime(path))[:6]
+
+
+def zip_response(entries: Iterable[Tuple[str, str]], filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        iter_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": content_disposition(filename)},
+    )
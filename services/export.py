@@ -0,0 +1,92 @@
+import csv
+import io
+import os
+import zlib
+from datetime import date, datetime
+from typing import AsyncIterator, Callable, List
+from fastapi.responses import StreamingResponse
+from services.responses import dumps
+
+# Documents fetched per cursor batch (and written per stream chunk)
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+# Yield lists of converted documents straight off a Motor cursor
+async def iter_batches(
+    collection, query: dict, fields: List[str], helper: Callable[[dict], dict], batch_size: int = EXPORT_BATCH_SIZE
+) -> AsyncIterator[List[dict]]:
+    cursor = collection.find(query, {field: 1 for field in fields}).sort("_id", 1).batch_size(batch_size)
+    batch = []
+    async for document in cursor:
+        batch.append(helper(document))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return ";".join(str(item) for item in value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+async def ndjson_chunks(batches: AsyncIterator[List[dict]]) -> AsyncIterator[bytes]:
+    async for batch in batches:
+        yield b"".join(dumps(document) + b"\n" for document in batch)
+
+
+async def csv_chunks(batches: AsyncIterator[List[dict]], columns: List[str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    async for batch in batches:
+        for document in batch:
+            writer.writerow([_csv_value(document.get(column)) for column in columns])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+# Compress a byte stream chunk by chunk into a single gzip member
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+# Stream a collection export; memory stays at one batch whatever the size
+def export_response(
+    collection,
+    query: dict,
+    columns: List[str],
+    helper: Callable[[dict], dict],
+    filename: str,
+    format: str = "ndjson",
+    gzip: bool = False,
+) -> StreamingResponse:
+    batches = iter_batches(collection, query, columns, helper)
+    chunks = csv_chunks(batches, ["id"] + columns) if format == "csv" else ndjson_chunks(batches)
+    media_type = EXPORT_FORMATS[format]
+    filename = f"{filename}.{format}"
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        media_type = "application/gzip"
+        filename += ".gz"
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
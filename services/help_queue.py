@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import List, Optional, Set
+from pymongo import ReturnDocument
+from database import help_request_collection, profile_collection
+
+logger = logging.getLogger(__name__)
+
+# How often each worker rebuilds its skill index from the profiles
+SKILL_INDEX_REFRESH = int(os.getenv("SKILL_INDEX_REFRESH", "60"))
+
+# Requests without a due date are served after every dated one
+NO_DUE_DATE = datetime(9999, 12, 31)
+
+
+def normalise_subject(subject: Optional[str]) -> str:
+    return (subject or "").strip().lower()
+
+
+# Precomputed subject -> helpers map (and its reverse) built from
+# UserProfile.skills, so matching never scans the profiles
+class SkillIndex:
+    def __init__(self, collection=profile_collection):
+        self.collection = collection
+        self._helpers_by_subject = {}
+        self._subjects_by_helper = {}
+        self.built_at = None
+
+    async def rebuild(self):
+        helpers_by_subject = {}
+        subjects_by_helper = {}
+        async for profile in self.collection.find({}, {"user_id": 1, "skills": 1}):
+            subjects = {normalise_subject(skill) for skill in profile.get("skills") or [] if skill.strip()}
+            subjects_by_helper[profile["user_id"]] = subjects
+            for subject in subjects:
+                helpers_by_subject.setdefault(subject, set()).add(profile["user_id"])
+        self._helpers_by_subject = helpers_by_subject
+        self._subjects_by_helper = subjects_by_helper
+        self.built_at = datetime.utcnow()
+
+    # Apply a profile change in this worker right away
+    def update(self, user_id: str, skills: Optional[List[str]]):
+        for subject in self._subjects_by_helper.pop(user_id, set()):
+            self._helpers_by_subject.get(subject, set()).discard(user_id)
+        if skills is None:
+            return
+        subjects = {normalise_subject(skill) for skill in skills if skill.strip()}
+        self._subjects_by_helper[user_id] = subjects
+        for subject in subjects:
+            self._helpers_by_subject.setdefault(subject, set()).add(user_id)
+
+    def helpers_for(self, subject: Optional[str]) -> Set[str]:
+        return set(self._helpers_by_subject.get(normalise_subject(subject), set()))
+
+    # None means the helper listed no skills and may take any subject
+    def subjects_for(self, user_id: str) -> Optional[Set[str]]:
+        subjects = self._subjects_by_helper.get(user_id)
+        return set(subjects) if subjects else None
+
+    async def run_refresher(self, interval: int = SKILL_INDEX_REFRESH):
+        while True:
+            try:
+                await self.rebuild()
+            except Exception:
+                logger.exception("Skill index rebuild failed")
+            await asyncio.sleep(interval)
+
+
+# Help-request queue: pending requests ordered by assignment due date and
+# claimed atomically, so two helpers can never take the same request
+class HelpQueue:
+    def __init__(self, collection=help_request_collection, skills: Optional[SkillIndex] = None):
+        self.collection = collection
+        self.skills = skills or SkillIndex()
+
+        # Metrics
+        self.claims = 0
+        self.empty_claims = 0
+        self.total_claim_seconds = 0.0
+        self.max_claim_seconds = 0.0
+
+    async def enqueue(self, assignment: dict, requested_by: str) -> dict:
+        request = {
+            "assignment_id": str(assignment["_id"]),
+            "requested_by": requested_by,
+            "status": "pending",
+            "created_at": datetime.utcnow(),
+            "subject": assignment.get("subject"),
+            "subject_key": normalise_subject(assignment.get("subject")),
+            "due_date": assignment.get("due_date"),
+            "priority": assignment.get("due_date") or NO_DUE_DATE,
+        }
+        result = await self.collection.insert_one(request)
+        request["_id"] = result.inserted_id
+        return request
+
+    def _pending_query(self, helper_id: str) -> dict:
+        query = {"status": "pending"}
+        subjects = self.skills.subjects_for(helper_id)
+        if subjects is not None:
+            query["subject_key"] = {"$in": sorted(subjects)}
+        return query
+
+    async def _claim(self, query: dict, helper: dict) -> Optional[dict]:
+        started = time.perf_counter()
+        request = await self.collection.find_one_and_update(
+            query,
+            {"$set": {"status": "in-progress", "claimed_by": helper["username"], "claimed_at": datetime.utcnow()}},
+            sort=[("priority", 1), ("_id", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+        elapsed = time.perf_counter() - started
+        self.claims += 1
+        self.total_claim_seconds += elapsed
+        self.max_claim_seconds = max(self.max_claim_seconds, elapsed)
+        if request is None:
+            self.empty_claims += 1
+        return request
+
+    # Claim the most urgent pending request matching the helper's skills
+    async def claim_next(self, helper: dict) -> Optional[dict]:
+        return await self._claim(self._pending_query(helper["_id"]), helper)
+
+    # Claim a specific request if it is still pending
+    async def claim(self, request_id, helper: dict) -> Optional[dict]:
+        return await self._claim({"_id": request_id, "status": "pending"}, helper)
+
+    async def complete(self, request_id, helper: dict) -> Optional[dict]:
+        return await self.collection.find_one_and_update(
+            {"_id": request_id, "status": "in-progress", "claimed_by": helper["username"]},
+            {"$set": {"status": "completed", "completed_at": datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def pending(self, helper_id: str, limit: int) -> List[dict]:
+        cursor = self.collection.find(self._pending_query(helper_id)).sort([("priority", 1), ("_id", 1)])
+        return await cursor.limit(limit).to_list(limit)
+
+    async def depth(self) -> int:
+        return await self.collection.count_documents({"status": "pending"})
+
+    def metrics(self) -> dict:
+        claims = self.claims or 1
+        return {
+            "claims": self.claims,
+            "empty_claims": self.empty_claims,
+            "avg_claim_ms": round(self.total_claim_seconds / claims * 1000, 3),
+            "max_claim_ms": round(self.max_claim_seconds * 1000, 3),
+            "skill_index_built_at": self.skills.built_at,
+        }
+
+
+skill_index = SkillIndex()
+help_queue = HelpQueue(skills=skill_index)
@@ -0,0 +1,368 @@
+import cProfile
+import io
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from pymongo import monitoring
+from starlette.routing import Match
+
+logger = logging.getLogger(__name__)
+
+# Instrumentation configuration
+MONGO_SLOW_MS = float(os.getenv("MONGO_SLOW_MS", "100"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))  # fraction of requests profiled
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "500"))  # keep profiles of requests slower than this
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))
+
+METRIC_PREFIX = "assignaid"
+
+# Seconds; covers a cached principal lookup up to a queued bcrypt burst
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# Cumulative histogram per label set, safe to update from Motor's threads
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._series: Dict[tuple, list] = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def items(self) -> List[Tuple[tuple, list]]:
+        with self._lock:
+            return [(labels, list(series)) for labels, series in self._series.items()]
+
+
+class Counter:
+    def __init__(self):
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def items(self) -> List[Tuple[tuple, float]]:
+        with self._lock:
+            return list(self._values.items())
+
+
+# Lets /metrics reach the middleware instance Starlette builds lazily
+class _RequestMetricsHandle:
+    def __init__(self):
+        self.middleware: Optional["RequestMetrics"] = None
+
+    def bind(self, middleware: "RequestMetrics"):
+        self.middleware = middleware
+
+
+request_metrics = _RequestMetricsHandle()
+
+
+# Per-route latency, status counts and in-flight requests, as pure ASGI
+# middleware so streamed responses are timed to their last byte
+class RequestMetrics:
+    def __init__(self, app):
+        self.app = app
+        self.latency = Histogram()
+        self.requests = Counter()
+        self.in_flight: Dict[tuple, int] = {}
+        self.profiles = deque(maxlen=PROFILE_KEEP)
+        self._profiling = False
+        request_metrics.bind(self)
+
+    # The route template, so /assignments/{id} is one series, not one per id
+    @staticmethod
+    def route_of(scope) -> str:
+        for route in scope["app"].routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", scope["path"])
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        labels = (scope["method"], self.route_of(scope))
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        # cProfile is process-wide: profile at most one request at a time
+        profiler = None
+        if PROFILE_SAMPLE_RATE and not self._profiling and random.random() < PROFILE_SAMPLE_RATE:
+            self._profiling = True
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        self.in_flight[labels] = self.in_flight.get(labels, 0) + 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.in_flight[labels] -= 1
+            self.latency.observe(labels, elapsed)
+            self.requests.inc(labels + (str(status[0]),))
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+                if elapsed * 1000 >= PROFILE_SLOW_MS:
+                    self._keep_profile(profiler, labels, elapsed)
+
+    def _keep_profile(self, profiler: cProfile.Profile, labels: tuple, elapsed: float):
+        import pstats  # only needed once a slow request was sampled
+
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(30)
+        self.profiles.append({
+            "at": datetime.utcnow(),
+            "method": labels[0],
+            "route": labels[1],
+            "ms": round(elapsed * 1000, 3),
+            # Other requests running concurrently on the loop show up too
+            "profile": out.getvalue(),
+        })
+
+
+# Times every Mongo command by collection and command name and flags slow
+# ones. Registered on the Motor client in database.py.
+class CommandMetrics(monitoring.CommandListener):
+    def __init__(self, slow_ms: float = MONGO_SLOW_MS):
+        self.slow_ms = slow_ms
+        self.latency = Histogram()
+        self.failures = Counter()
+        self.slow = Counter()
+        self.recent_slow = deque(maxlen=50)
+        self._pending: Dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(event) -> tuple:
+        return (event.connection_id, event.request_id)
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        collection = target if isinstance(target, str) else "-"
+        with self._lock:
+            self._pending[self._key(event)] = (collection, event.command)
+
+    def _finish(self, event) -> Optional[tuple]:
+        with self._lock:
+            pending = self._pending.pop(self._key(event), None)
+        return pending
+
+    def succeeded(self, event):
+        pending = self._finish(event)
+        if pending is None:
+            return
+        collection, command = pending
+        labels = (collection, event.command_name)
+        seconds = event.duration_micros / 1e6
+        self.latency.observe(labels, seconds)
+        if seconds * 1000 >= self.slow_ms:
+            self.slow.inc(labels)
+            summary = _summarize(command)
+            self.recent_slow.append({"at": datetime.utcnow(), "collection": collection, "command": event.command_name, "ms": round(seconds * 1000, 3), "summary": str(summary)[:500]})
+            logger.warning("Slow Mongo %s on %s: %.1f ms %s", event.command_name, collection, seconds * 1000, str(summary)[:500])
+
+    def failed(self, event):
+        pending = self._finish(event)
+        collection = pending[0] if pending else "-"
+        self.latency.observe((collection, event.command_name), event.duration_micros / 1e6)
+        self.failures.inc((collection, event.command_name))
+
+
+# Shape of a slow command for the log: its filter/sort/pipeline, and only
+# the field names of an update (the values may be user data or hashes)
+def _summarize(command) -> dict:
+    summary = {key: value for key, value in command.items() if key in ("filter", "query", "sort", "pipeline", "deletes", "q", "limit")}
+    if "update" in command and not isinstance(command["update"], str):
+        summary["update"] = _update_keys(command["update"])
+    if "updates" in command:
+        summary["updates"] = [{"q": item.get("q"), "u": _update_keys(item.get("u"))} for item in command["updates"]]
+    return summary
+
+
+def _update_keys(update):
+    if isinstance(update, list):  # pipeline update
+        return [_update_keys(stage) for stage in update]
+    if not isinstance(update, Mapping):
+        return update
+    return {key: sorted(value) if isinstance(value, Mapping) else "..." for key, value in update.items()}
+
+
+command_metrics = CommandMetrics()
+
+
+# Connection pool occupancy across all servers, for readiness and /metrics
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    def __init__(self):
+        self.open = 0  # connections created and not yet closed
+        self.checked_out = 0
+        self.waiting = 0  # check-outs started and not yet served
+        self.check_out_failures = 0
+        self.max_pool_size = None  # set by database.py
+        self._lock = threading.Lock()
+
+    def _add(self, field: str, delta: int):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + delta)
+
+    def connection_created(self, event):
+        self._add("open", 1)
+
+    def connection_closed(self, event):
+        self._add("open", -1)
+
+    def connection_check_out_started(self, event):
+        self._add("waiting", 1)
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.waiting -= 1
+            self.checked_out += 1
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.waiting -= 1
+            self.check_out_failures += 1
+
+    def connection_checked_in(self, event):
+        self._add("checked_out", -1)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    # Share of the pool in use; 1.0 means every further request queues
+    def saturation(self) -> float:
+        if not self.max_pool_size:
+            return 0.0
+        return self.checked_out / self.max_pool_size
+
+    def metrics(self) -> dict:
+        return {
+            "open": self.open,
+            "checked_out": self.checked_out,
+            "waiting": self.waiting,
+            "check_out_failures": self.check_out_failures,
+            "max_pool_size": self.max_pool_size,
+            "saturation": round(self.saturation(), 3),
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+# Prometheus text exposition (format 0.0.4)
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Iterable[str], values: Iterable, extra: str = "") -> str:
+    pairs = ['%s="%s"' % (name, _escape(value)) for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _histogram_lines(name: str, help: str, histogram: Histogram, label_names: Tuple[str, ...]) -> List[str]:
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} histogram"]
+    for labels, series in sorted(histogram.items()):
+        for bound, count in zip(histogram.buckets, series):
+            bucket = _labels(label_names, labels, 'le="%s"' % bound)
+            lines.append(f"{name}_bucket{bucket} {count}")
+        bucket = _labels(label_names, labels, 'le="+Inf"')
+        lines.append(f"{name}_bucket{bucket} {series[-1]}")
+        lines.append(f"{name}_sum{_labels(label_names, labels)} {series[-2]}")
+        lines.append(f"{name}_count{_labels(label_names, labels)} {series[-1]}")
+    return lines
+
+
+def _counter_lines(name: str, help: str, counter: Counter, label_names: Tuple[str, ...], kind: str = "counter") -> List[str]:
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    for labels, value in sorted(counter.items()):
+        lines.append(f"{name}{_labels(label_names, labels)} {value}")
+    return lines
+
+
+# Numeric leaves of the JSON snapshot become gauges named by their path
+def _gauge_lines(snapshot: dict, prefix: str = METRIC_PREFIX) -> List[str]:
+    lines = []
+    for key, value in snapshot.items():
+        name = f"{prefix}_{''.join(c if c.isalnum() else '_' for c in str(key))}"
+        if isinstance(value, dict):
+            lines.extend(_gauge_lines(value, name))
+        elif isinstance(value, bool):
+            lines.append(f"{name} {int(value)}")
+        elif isinstance(value, (int, float)):
+            lines.append(f"{name} {value}")
+    return lines
+
+
+def render_prometheus(snapshot: dict) -> str:
+    lines = []
+    middleware = request_metrics.middleware
+    if middleware is not None:
+        lines += _histogram_lines(f"{METRIC_PREFIX}_http_request_duration_seconds", "HTTP request latency by route.", middleware.latency, ("method", "route"))
+        lines += _counter_lines(f"{METRIC_PREFIX}_http_requests_total", "HTTP requests by route and status.", middleware.requests, ("method", "route", "status"))
+        in_flight = Counter()
+        for labels, value in list(middleware.in_flight.items()):
+            in_flight.inc(labels, value)
+        lines += _counter_lines(f"{METRIC_PREFIX}_http_requests_in_flight", "HTTP requests being served.", in_flight, ("method", "route"), kind="gauge")
+    lines += _histogram_lines(f"{METRIC_PREFIX}_mongo_command_duration_seconds", "Mongo command latency.", command_metrics.latency, ("collection", "command"))
+    lines += _counter_lines(f"{METRIC_PREFIX}_mongo_slow_commands_total", f"Mongo commands slower than {MONGO_SLOW_MS} ms.", command_metrics.slow, ("collection", "command"))
+    lines += _counter_lines(f"{METRIC_PREFIX}_mongo_command_failures_total", "Failed Mongo commands.", command_metrics.failures, ("collection", "command"))
+    lines += _gauge_lines(snapshot)
+    return "\n".join(lines) + "\n"
+
+
+# The same request and Mongo figures for the JSON view
+def instrumentation_snapshot() -> dict:
+    middleware = request_metrics.middleware
+    http = {}
+    if middleware is not None:
+        for (method, route), series in middleware.latency.items():
+            http[f"{method} {route}"] = {
+                "count": series[-1],
+                "avg_ms": round(series[-2] / series[-1] * 1000, 3) if series[-1] else 0,
+                "in_flight": middleware.in_flight.get((method, route), 0),
+            }
+    mongo = {
+        f"{collection}.{command}": {"count": series[-1], "avg_ms": round(series[-2] / series[-1] * 1000, 3) if series[-1] else 0}
+        for (collection, command), series in command_metrics.latency.items()
+    }
+    return {"http": http, "mongo": mongo}
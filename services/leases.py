@@ -0,0 +1,37 @@
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+from database import lease_collection
+
+# Identifies this process among the uvicorn workers and hosts
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+# Time-limited lock held in Mongo so exactly one worker runs a job. The
+# holder renews it well before it expires; if the holder dies, another
+# worker takes over once the lease runs out.
+class Lease:
+    def __init__(self, name: str, ttl: int, collection=lease_collection, owner: str = WORKER_ID):
+        self.name = name
+        self.ttl = ttl
+        self.collection = collection
+        self.owner = owner
+
+    # Take or renew the lease; True while this worker holds it
+    async def acquire(self) -> bool:
+        now = datetime.utcnow()
+        try:
+            await self.collection.find_one_and_update(
+                {"_id": self.name, "$or": [{"owner": self.owner}, {"expires_at": {"$lte": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=self.ttl)}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # Someone else holds an unexpired lease (the upsert lost the race)
+            return False
+        return True
+
+    async def release(self):
+        await self.collection.delete_one({"_id": self.name, "owner": self.owner})
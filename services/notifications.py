@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+from bson import ObjectId
+from database import notification_collection
+
+logger = logging.getLogger(__name__)
+
+# Notification hub configuration
+NOTIFY_QUEUE_SIZE = int(os.getenv("NOTIFY_QUEUE_SIZE", "100"))  # undelivered messages per connection
+NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", "500"))  # notifications per insert_many
+NOTIFY_FLUSH_INTERVAL = float(os.getenv("NOTIFY_FLUSH_INTERVAL", "1"))  # seconds
+NOTIFY_RELAY_INTERVAL = float(os.getenv("NOTIFY_RELAY_INTERVAL", "1"))  # seconds between polls for other workers' notifications
+# How far back a poll looks: covers a publish on another worker waiting for
+# its next batched write
+NOTIFY_RELAY_LOOKBACK = 4 * NOTIFY_FLUSH_INTERVAL + 2 * NOTIFY_RELAY_INTERVAL
+
+
+# One open WebSocket. Messages wait in a bounded queue; a consumer too slow
+# to keep up is cut off instead of growing memory without limit.
+class Subscriber:
+    def __init__(self, user_id: str, queue_size: int = NOTIFY_QUEUE_SIZE):
+        self.user_id = user_id
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def offer(self, message: dict) -> bool:
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.overflowed = True
+            return False
+
+
+# In-process pub/sub: handlers publish, the hub fans out to the recipient's
+# connections in this worker and buffers the documents for batched writes.
+# With several workers, each one also polls for recent notifications of its
+# connected users that another worker published (relay).
+class NotificationHub:
+    def __init__(self, collection=notification_collection):
+        self.collection = collection
+        self.subscribers = {}
+        self._buffer = []
+        self._flush_lock = asyncio.Lock()
+        self._seen = {}  # notification id -> when this worker delivered it
+
+        # Metrics
+        self.published = 0
+        self.delivered = 0
+        self.relayed = 0
+        self.dropped_connections = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+
+    def connect(self, user_id: str) -> Subscriber:
+        subscriber = Subscriber(user_id)
+        self.subscribers.setdefault(user_id, set()).add(subscriber)
+        return subscriber
+
+    def disconnect(self, subscriber: Subscriber):
+        connections = self.subscribers.get(subscriber.user_id)
+        if connections is not None:
+            connections.discard(subscriber)
+            if not connections:
+                del self.subscribers[subscriber.user_id]
+
+    # Never blocks the publishing request: delivery is a queue put and the
+    # write happens in the next batch
+    def publish(self, recipients: Iterable[str], message: str, event: Optional[str] = None, assignment_id: Optional[str] = None):
+        now = datetime.utcnow()
+        for user_id in set(recipients):
+            if not user_id:
+                continue
+            notification = {
+                "_id": ObjectId(),
+                "user_id": user_id,
+                "message": message,
+                "created_at": now,
+                "is_read": False,
+                "event": event,
+                "assignment_id": assignment_id,
+            }
+            self._buffer.append(notification)
+            self.published += 1
+            self._seen[notification["_id"]] = now
+            self._deliver(notification)
+
+        if len(self._buffer) >= NOTIFY_BATCH_SIZE:
+            asyncio.ensure_future(self.flush())
+
+    def _deliver(self, notification: dict):
+        for subscriber in list(self.subscribers.get(notification["user_id"], ())):
+            if subscriber.offer(notification_helper(notification)):
+                self.delivered += 1
+            else:
+                self.dropped_connections += 1
+                self.disconnect(subscriber)
+
+    # Deliver what other workers published for users connected here
+    async def relay(self):
+        now = datetime.utcnow()
+        horizon = now - timedelta(seconds=NOTIFY_RELAY_LOOKBACK)
+        self._seen = {id: at for id, at in self._seen.items() if at >= horizon}
+        if not self.subscribers:
+            return
+        query = {"user_id": {"$in": list(self.subscribers)}, "_id": {"$gt": ObjectId.from_datetime(horizon)}}
+        async for notification in self.collection.find(query).sort("_id", 1):
+            if notification["_id"] in self._seen:
+                continue
+            self._seen[notification["_id"]] = now
+            self._deliver(notification)
+            self.relayed += 1
+
+    async def run_relay(self, interval: float = NOTIFY_RELAY_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.relay()
+            except Exception:
+                logger.exception("Notification relay failed")
+
+    # Write everything buffered so far in one unordered insert
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._buffer:
+                return
+            batch, self._buffer = self._buffer, []
+            try:
+                await self.collection.insert_many(batch, ordered=False)
+                self.flushes += 1
+            except Exception:
+                # Keep the batch for the next flush rather than losing it
+                self.failed_flushes += 1
+                self._buffer = batch + self._buffer
+                logger.exception("Persisting %d notifications failed", len(batch))
+
+    async def run_flusher(self, interval: float = NOTIFY_FLUSH_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+    def metrics(self) -> dict:
+        return {
+            "connections": sum(len(connections) for connections in self.subscribers.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+            "relayed": self.relayed,
+            "dropped_connections": self.dropped_connections,
+            "buffered": len(self._buffer),
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+# Helper function to convert MongoDB ObjectId to string
+def notification_helper(notification) -> dict:
+    return {
+        "id": str(notification["_id"]),
+        "user_id": notification["user_id"],
+        "message": notification["message"],
+        "created_at": notification["created_at"].isoformat(),
+        "is_read": notification["is_read"],
+        "event": notification.get("event"),
+        "assignment_id": notification.get("assignment_id"),
+    }
+
+
+notification_hub = NotificationHub()
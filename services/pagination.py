@@ -0,0 +1,73 @@
+import base64
+import json
+import os
+from typing import Callable, List, Optional, Tuple
+from bson import ObjectId
+from fastapi import HTTPException, Response
+
+# Page size limits for list endpoints
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "200"))
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+# Opaque cursor: the last _id of the previous page. ObjectIds grow with
+# insertion time, so paging on _id is paging on creation order. Extra sort
+# keys (e.g. a search score) ride along in the same token.
+def encode_cursor(last_id: ObjectId, **extra) -> str:
+    raw = json.dumps({"id": str(last_id), **extra}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor_state(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded))
+        state["id"] = ObjectId(state["id"])
+        return state
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def decode_cursor(cursor: str) -> ObjectId:
+    return decode_cursor_state(cursor)["id"]
+
+
+# Parse a comma separated ?fields= value against the allowed field names
+def parse_fields(fields: Optional[str], allowed: List[str], default: List[str]) -> List[str]:
+    if not fields:
+        return default
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+
+# Fetch one page newest first using keyset pagination on _id
+async def paginate(
+    collection,
+    query: dict,
+    fields: List[str],
+    limit: int,
+    cursor: Optional[str],
+    helper: Callable[[dict], dict],
+) -> Tuple[List[dict], Optional[str]]:
+    if cursor:
+        query = {**query, "_id": {"$lt": decode_cursor(cursor)}}
+
+    projection = {field: 1 for field in fields}
+    documents = await collection.find(query, projection).sort("_id", -1).limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(documents[-1]["_id"])
+    return [helper(document) for document in documents], next_cursor
+
+
+# Expose the next page cursor without changing the list response body
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -0,0 +1,113 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Password hashing configuration
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 2))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+
+# Raised when too many hashes are already waiting for a worker
+class HasherBusyError(Exception):
+    pass
+
+
+# Shared bcrypt service: runs hash/verify on a bounded thread pool so the
+# event loop keeps serving other requests while a login burst is hashed.
+class PasswordHasher:
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_MAX_QUEUE):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self._context = None
+        self._executor: ThreadPoolExecutor = None
+        self._slots = asyncio.Semaphore(self.workers)
+
+        # Metrics
+        self.queue_depth = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_hash_seconds = 0.0
+        self.max_hash_seconds = 0.0
+        self.total_wait_seconds = 0.0
+
+    # passlib and the bcrypt backend load on the first hash, not at import
+    def _get_context(self):
+        if self._context is None:
+            from passlib.context import CryptContext
+            self._context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        return self._context
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pwhash")
+        return self._executor
+
+    async def _run(self, func, *args, admit: bool = True):
+        # Admission control: only hashing callers wait, everyone else keeps going
+        if admit and self.queue_depth >= self.max_queue and self._slots.locked():
+            self.rejected += 1
+            raise HasherBusyError("Password hashing queue is full")
+
+        enqueued = time.perf_counter()
+        self.queue_depth += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queue_depth -= 1
+
+        try:
+            started = time.perf_counter()
+            self.total_wait_seconds += started - enqueued
+            self.in_flight += 1
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.in_flight -= 1
+            self.completed += 1
+            self.total_hash_seconds += elapsed
+            self.max_hash_seconds = max(self.max_hash_seconds, elapsed)
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self._get_context().hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(self._get_context().verify, plain_password, hashed_password)
+
+    # Hash many passwords in parallel for bulk imports. At most `workers`
+    # of them queue at once, so interactive logins are never rejected
+    # because of an import; they just share the pool with it.
+    async def hash_many(self, passwords: list) -> list:
+        limit = asyncio.Semaphore(self.workers)
+
+        async def hash_one(password: str) -> str:
+            async with limit:
+                return await self._run(self._get_context().hash, password, admit=False)
+
+        return await asyncio.gather(*(hash_one(password) for password in passwords))
+
+    def metrics(self) -> dict:
+        completed = self.completed or 1
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_hash_ms": round(self.total_hash_seconds / completed * 1000, 3),
+            "max_hash_ms": round(self.max_hash_seconds * 1000, 3),
+            "avg_wait_ms": round(self.total_wait_seconds / completed * 1000, 3),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+# Single instance shared by the login and user routes
+password_hasher = PasswordHasher()
@@ -0,0 +1,155 @@
+import logging
+import sys
+from typing import List, Optional
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from database import rating_collection, review_collection, run_with_client
+
+logger = logging.getLogger(__name__)
+
+RATINGS = range(1, 6)
+ASSIGNMENT = "assignment"
+HELPER = "helper"
+
+
+def rating_id(kind: str, key: str) -> str:
+    return f"{kind}:{key}"
+
+
+def review_targets(review: dict) -> List[tuple]:
+    targets = [(ASSIGNMENT, review["assignment_id"])]
+    if review.get("helper"):
+        targets.append((HELPER, review["helper"]))
+    return targets
+
+
+# Materialised rating aggregates: one document per assignment and per
+# helper holding count, sum, a 1-5 histogram and the average, maintained
+# incrementally by the review writes so reads are a single _id lookup.
+class RatingAggregates:
+    def __init__(self, collection=rating_collection, reviews=review_collection):
+        self.collection = collection
+        self.reviews = reviews
+
+    async def _apply(self, kind: str, key: str, count: int, total: int, histogram: dict):
+        increments = {"count": count, "sum": total}
+        increments.update({f"histogram.{rating}": delta for rating, delta in histogram.items() if delta})
+        aggregate = await self.collection.find_one_and_update(
+            {"_id": rating_id(kind, key)},
+            {"$inc": increments, "$set": {"kind": kind, "key": key}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        # $inc cannot divide; store the average only if no other write has
+        # moved the counters since, so the last writer always leaves it exact
+        average = aggregate["sum"] / aggregate["count"] if aggregate["count"] else None
+        await self.collection.update_one(
+            {"_id": aggregate["_id"], "count": aggregate["count"], "sum": aggregate["sum"]},
+            {"$set": {"average": average}},
+        )
+
+    async def added(self, review: dict):
+        for kind, key in review_targets(review):
+            await self._apply(kind, key, 1, review["rating"], {review["rating"]: 1})
+
+    async def removed(self, review: dict):
+        for kind, key in review_targets(review):
+            await self._apply(kind, key, -1, -review["rating"], {review["rating"]: -1})
+
+    async def changed(self, previous: dict, rating: int):
+        if previous["rating"] == rating:
+            return
+        for kind, key in review_targets(previous):
+            await self._apply(kind, key, 0, rating - previous["rating"], {previous["rating"]: -1, rating: 1})
+
+    async def get(self, kind: str, key: str) -> Optional[dict]:
+        return await self.collection.find_one({"_id": rating_id(kind, key)})
+
+    # Highest average first, among entities with at least min_count reviews
+    async def leaderboard(self, kind: str, limit: int, min_count: int = 1) -> List[dict]:
+        cursor = self.collection.find({"kind": kind, "count": {"$gte": min_count}})
+        return await cursor.sort([("average", DESCENDING), ("count", DESCENDING)]).limit(limit).to_list(limit)
+
+    # Expected aggregates of one kind, computed by Mongo and streamed in
+    # _id order
+    async def _expected(self, kind: str):
+        field = "assignment_id" if kind == ASSIGNMENT else "helper"
+        pipeline = [
+            {"$match": {field: {"$ne": None}}},
+            {"$group": {"_id": {"key": f"${field}", "rating": "$rating"}, "n": {"$sum": 1}}},
+            {"$group": {"_id": "$_id.key", "ratings": {"$push": {"rating": "$_id.rating", "n": "$n"}}}},
+            {"$sort": {"_id": ASCENDING}},
+        ]
+        async for row in self.reviews.aggregate(pipeline, allowDiskUse=True):
+            aggregate = {"kind": kind, "key": row["_id"], "count": 0, "sum": 0, "histogram": {}}
+            for bucket in row["ratings"]:
+                aggregate["count"] += bucket["n"]
+                aggregate["sum"] += bucket["rating"] * bucket["n"]
+                aggregate["histogram"][str(bucket["rating"])] = bucket["n"]
+            aggregate["average"] = aggregate["sum"] / aggregate["count"]
+            yield aggregate
+
+    # Stored aggregates of one kind in _id order (an _id index range scan)
+    def _stored(self, kind: str):
+        return self.collection.find({"_id": {"$gte": f"{kind}:", "$lt": f"{kind};"}}).sort("_id", ASCENDING)
+
+    # Recompute every aggregate from the reviews; returns the entities whose
+    # stored aggregate differed (and rewrites them unless dry_run). Expected
+    # and stored aggregates are merged as two sorted streams, so memory does
+    # not grow with the number of assignments or helpers.
+    async def rebuild(self, dry_run: bool = False) -> List[str]:
+        mismatched = []
+        for kind in (ASSIGNMENT, HELPER):
+            expected, stored = self._expected(kind), self._stored(kind)
+            want, have = await _next(expected), await _next(stored)
+            while want is not None or have is not None:
+                want_id = rating_id(kind, want["key"]) if want is not None else None
+                have_id = have["_id"] if have is not None else None
+                if have_id is None or (want_id is not None and want_id < have_id):
+                    id, pair = want_id, (want, None)
+                    want = await _next(expected)
+                elif want_id is None or have_id < want_id:
+                    id, pair = have_id, (None, have)
+                    have = await _next(stored)
+                else:
+                    id, pair = want_id, (want, have)
+                    want, have = await _next(expected), await _next(stored)
+                if not await self._compare(id, *pair, dry_run=dry_run):
+                    mismatched.append(id)
+        if mismatched:
+            logger.info("Rating aggregates out of date: %s", mismatched)
+        return mismatched
+
+    # True when the stored aggregate matches; otherwise rewrite it unless dry_run
+    async def _compare(self, id: str, want: Optional[dict], have: Optional[dict], dry_run: bool) -> bool:
+        if have is not None:
+            have = {k: v for k, v in have.items() if k != "_id"}
+            have["histogram"] = {k: v for k, v in have.get("histogram", {}).items() if v}
+            if not have.get("count"):
+                have = None
+        if want == have:
+            return True
+        if not dry_run:
+            if want is None:
+                await self.collection.delete_one({"_id": id})
+            else:
+                await self.collection.replace_one({"_id": id}, want, upsert=True)
+        return False
+
+
+async def _next(iterator):
+    try:
+        return await iterator.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+rating_aggregates = RatingAggregates()
+
+
+# python -m services.ratings [--apply]  (lists stale aggregates; dry run by default)
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    stale = run_with_client(rating_aggregates.rebuild, dry_run="--apply" not in sys.argv)
+    print(f"{len(stale)} aggregate(s) out of date")
+    for id in stale:
+        print(id)
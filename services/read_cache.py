@@ -0,0 +1,124 @@
+import asyncio
+import importlib
+import os
+from typing import Any, Awaitable, Callable, Hashable, Optional
+from services.cache import TTLCache
+
+# Read-through cache configuration
+READ_CACHE_SIZE = int(os.getenv("READ_CACHE_SIZE", "5000"))
+READ_CACHE_TTL = float(os.getenv("READ_CACHE_TTL", "10"))
+# Optional shared backend factory as "module:attribute", e.g. a Redis adapter
+READ_CACHE_BACKEND = os.getenv("READ_CACHE_BACKEND")
+
+
+# Interface a cache backend has to provide. A shared backend (Redis,
+# memcached, ...) implements the same three calls.
+class CacheBackend:
+    async def get(self, key: Hashable) -> Optional[Any]:
+        raise NotImplementedError
+
+    async def set(self, key: Hashable, value: Any):
+        raise NotImplementedError
+
+    async def delete(self, key: Hashable):
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {}
+
+
+# Default backend: per-process LRU with TTL
+class MemoryCacheBackend(CacheBackend):
+    def __init__(self, maxsize: int = READ_CACHE_SIZE, ttl: float = READ_CACHE_TTL):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: Hashable) -> Optional[Any]:
+        return self._cache.get(key)
+
+    async def set(self, key: Hashable, value: Any):
+        self._cache.set(key, value)
+
+    async def delete(self, key: Hashable):
+        self._cache.pop(key)
+
+    def stats(self) -> dict:
+        return {"size": len(self._cache), "evictions": self._cache.evictions}
+
+
+def create_backend() -> CacheBackend:
+    if READ_CACHE_BACKEND:
+        module_name, _, attribute = READ_CACHE_BACKEND.partition(":")
+        return getattr(importlib.import_module(module_name), attribute)()
+    return MemoryCacheBackend()
+
+
+# Read-through cache with single-flight loading: concurrent misses for
+# the same key share one loader call instead of each hitting Mongo.
+class ReadThroughCache:
+    def __init__(self, name: str, backend: Optional[CacheBackend] = None):
+        self.name = name
+        self.backend = backend or create_backend()
+        self._inflight = {}
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        value = await self.backend.get((self.name, key))
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else is waiting
+            raise
+        finally:
+            owner = self._inflight.get(key) is future
+            if owner:
+                del self._inflight[key]
+
+        # Don't store a value an invalidation raced with; None is not cached
+        if owner and value is not None:
+            await self.backend.set((self.name, key), value)
+        future.set_result(value)
+        return value
+
+    # Cached value without loading on a miss
+    async def peek(self, key: Hashable) -> Any:
+        value = await self.backend.get((self.name, key))
+        if value is not None:
+            self.hits += 1
+        return value
+
+    async def invalidate(self, key: Hashable):
+        self.invalidations += 1
+        self._inflight.pop(key, None)
+        await self.backend.delete((self.name, key))
+
+    def metrics(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "invalidations": self.invalidations,
+            **self.backend.stats(),
+        }
+
+
+# Caches for the single-document GET routes
+assignment_cache = ReadThroughCache("assignments")
+solution_cache = ReadThroughCache("solutions")
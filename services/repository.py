@@ -0,0 +1,125 @@
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+from bson import ObjectId
+from pymongo import ReturnDocument
+from database import assignment_collection, solution_collection, subscription_collection, user_collection
+from services.conditional import touch
+
+
+# Current UTC time at the millisecond precision Mongo stores
+def utcnow() -> datetime:
+    now = datetime.utcnow()
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+# Single round trip CRUD helpers shared by the routes. Every write returns
+# the resulting document itself so handlers never re-read what they wrote.
+# Writes also bump the document's "version" (used for ETags) and note a
+# change for the list scopes the document belongs to (Last-Modified), which
+# the change log persists in batches.
+class Repository:
+    def __init__(
+        self,
+        collection,
+        scopes: Optional[Callable[[dict], List[str]]] = None,
+        scope_fields: Optional[List[str]] = None,
+    ):
+        self.collection = collection
+        self.scopes = scopes or (lambda document: [collection.name])
+        self.scope_fields = scope_fields or []
+
+    def _touch(self, *documents: Optional[dict]):
+        scopes = []
+        for document in documents:
+            if document is not None:
+                scopes.extend(self.scopes(document))
+        touch(scopes, utcnow())
+
+    async def get(self, id: str, projection: Optional[dict] = None) -> Optional[dict]:
+        return await self.collection.find_one({"_id": ObjectId(id)}, projection)
+
+    # Only the version counter, for conditional requests
+    async def get_version(self, id: str) -> Optional[int]:
+        document = await self.collection.find_one({"_id": ObjectId(id)}, {"_id": 1, "version": 1})
+        return None if document is None else document.get("version", 0)
+
+    # Insert and echo the document back with its new _id
+    async def insert(self, document: dict) -> dict:
+        document["version"] = 1
+        document["updated_at"] = utcnow()
+        result = await self.collection.insert_one(document)
+        document["_id"] = result.inserted_id
+        self._touch(document)
+        return document
+
+    # Unordered bulk insert; documents get their _id client side, so on a
+    # BulkWriteError the ones without a write error were inserted
+    async def insert_many(self, documents: List[dict]):
+        now = utcnow()
+        for document in documents:
+            document["version"] = 1
+            document["updated_at"] = now
+        try:
+            return await self.collection.insert_many(documents, ordered=False)
+        finally:
+            self._touch(*documents)
+
+    # $set the fields and return the updated document, or None if no
+    # document matched (an update that changes nothing still succeeds)
+    async def update(self, id: str, fields: dict) -> Optional[dict]:
+        if not fields:
+            return await self.get(id)
+        document = await self.collection.find_one_and_update(
+            {"_id": ObjectId(id)},
+            {"$set": {**fields, "updated_at": utcnow()}, "$inc": {"version": 1}},
+            return_document=ReturnDocument.AFTER,
+        )
+        self._touch(document)
+        return document
+
+    # Like update, but also returns the document as it was before the
+    # write; the updated one is echoed locally from it
+    async def update_with_previous(self, id: str, fields: dict) -> Tuple[Optional[dict], Optional[dict]]:
+        if not fields:
+            document = await self.get(id)
+            return document, document
+        fields = {**fields, "updated_at": utcnow()}
+        previous = await self.collection.find_one_and_update(
+            {"_id": ObjectId(id)},
+            {"$set": fields, "$inc": {"version": 1}},
+            return_document=ReturnDocument.BEFORE,
+        )
+        if previous is None:
+            return None, None
+        updated = {**previous, **fields, "version": previous.get("version", 0) + 1}
+        self._touch(previous, updated)
+        return previous, updated
+
+    # Append one value to each given array field; returns the updated document or None
+    async def push(self, id: str, values: dict) -> Optional[dict]:
+        document = await self.collection.find_one_and_update(
+            {"_id": ObjectId(id)},
+            {"$push": values, "$set": {"updated_at": utcnow()}, "$inc": {"version": 1}},
+            return_document=ReturnDocument.AFTER,
+        )
+        self._touch(document)
+        return document
+
+    # Delete and return the removed document, or None if it did not exist
+    async def delete(self, id: str, projection: Optional[dict] = None) -> Optional[dict]:
+        if projection is not None:
+            projection = {**projection, **{field: 1 for field in self.scope_fields}}
+        document = await self.collection.find_one_and_delete({"_id": ObjectId(id)}, projection=projection)
+        self._touch(document)
+        return document
+
+
+assignment_repository = Repository(assignment_collection)
+# Solution lists are per assignment, so changes are tracked per assignment
+solution_repository = Repository(
+    solution_collection,
+    scopes=lambda solution: [f"solutions:{solution.get('assignment_id')}"],
+    scope_fields=["assignment_id"],
+)
+user_repository = Repository(user_collection)
+subscription_repository = Repository(subscription_collection)
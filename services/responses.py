@@ -0,0 +1,64 @@
+import json
+import os
+from datetime import date, datetime
+from typing import Any, Optional, Type
+from bson import ObjectId
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # Fall back to the stdlib encoder
+    orjson = None
+
+# Opt-in: serialise trusted repository documents directly instead of
+# re-validating them against the route's response_model
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "false").lower() == "true"
+
+
+def _default(value: Any):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+# JSON response with native ObjectId/datetime handling
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# Keep only the keys the response model declares, like response_model does
+def _shape(document: dict, fields) -> dict:
+    return {key: document[key] for key in fields if key in document}
+
+
+# Return `content` from a route. In fast mode the documents (already built
+# by the *_helper functions) are trimmed to `model`'s fields and encoded
+# directly; headers set on the injected `response` are carried over.
+def respond(content: Any, model: Optional[Type[BaseModel]] = None, response: Optional[Response] = None):
+    if not FAST_JSON_RESPONSES:
+        return content
+
+    if model is not None:
+        fields = model.model_fields
+        if isinstance(content, list):
+            content = [_shape(document, fields) for document in content]
+        else:
+            content = _shape(content, fields)
+
+    fast_response = FastJSONResponse(content)
+    if response is not None:
+        fast_response.headers.update(
+            {key: value for key, value in response.headers.items() if key != "content-length"}
+        )
+    return fast_response
@@ -0,0 +1,210 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Awaitable, Callable, Optional
+from fastapi import HTTPException
+from database import upload_session_collection
+from services.storage import MAX_UPLOAD_FILE_SIZE, UPLOAD_CHUNK_SIZE, StoredFile, remove_quietly
+
+logger = logging.getLogger(__name__)
+
+# Resumable upload configuration
+UPLOAD_SESSION_DIR = os.getenv("UPLOAD_SESSION_DIR", "upload_sessions")
+UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", str(24 * 3600)))  # seconds without progress
+UPLOAD_SESSION_SWEEP_INTERVAL = int(os.getenv("UPLOAD_SESSION_SWEEP_INTERVAL", "300"))
+UPLOAD_SESSION_LEASE = 120  # seconds one PATCH may hold a session
+
+
+# Resumable uploads: create a session, PATCH chunks at the current offset,
+# then complete it into the blob store. Sessions live in Mongo and their
+# bytes in UPLOAD_SESSION_DIR, so any worker can continue any session.
+class ResumableUploads:
+    def __init__(self, collection=upload_session_collection, directory: str = UPLOAD_SESSION_DIR):
+        self.collection = collection
+        self.directory = directory
+
+    def _part_path(self, id: str) -> str:
+        return os.path.join(self.directory, f"{id}.part")
+
+    def _expiry(self) -> datetime:
+        return datetime.utcnow() + timedelta(seconds=UPLOAD_SESSION_TTL)
+
+    # Mongo keeps milliseconds; truncate so a lease can be matched exactly
+    @staticmethod
+    def _lease_deadline() -> datetime:
+        deadline = datetime.utcnow() + timedelta(seconds=UPLOAD_SESSION_LEASE)
+        return deadline.replace(microsecond=deadline.microsecond // 1000 * 1000)
+
+    # Extend a lease this request still holds; None once someone else has it
+    async def _renew(self, id: str, lease: datetime) -> Optional[datetime]:
+        renewed = self._lease_deadline()
+        result = await self.collection.update_one({"_id": id, "locked_until": lease}, {"$set": {"locked_until": renewed}})
+        return renewed if result.matched_count else None
+
+    async def create(self, owner: str, filename: str, size: int) -> dict:
+        if size > MAX_UPLOAD_FILE_SIZE:
+            raise HTTPException(status_code=413, detail=f"File exceeds {MAX_UPLOAD_FILE_SIZE} bytes")
+        session = {
+            "_id": uuid.uuid4().hex,
+            "owner": owner,
+            "filename": os.path.basename(filename),
+            "size": size,
+            "offset": 0,
+            "created_at": datetime.utcnow(),
+            "expires_at": self._expiry(),
+            "locked_until": None,
+        }
+        await asyncio.to_thread(os.makedirs, self.directory, exist_ok=True)
+        await asyncio.to_thread(_create_empty, self._part_path(session["_id"]))
+        await self.collection.insert_one(session)
+        return session
+
+    async def get(self, id: str, owner: str) -> dict:
+        session = await self.collection.find_one({"_id": id})
+        if session is None or session["expires_at"] <= datetime.utcnow():
+            raise HTTPException(status_code=404, detail="Upload session not found")
+        if session["owner"] != owner:
+            raise HTTPException(status_code=403, detail="Not your upload session")
+        return session
+
+    # Write a chunk that starts at `offset`; returns the new offset. A lease
+    # on the session keeps two requests (on any worker) from writing at once;
+    # it is renewed while the body streams and every write happens under it.
+    async def append(self, id: str, owner: str, offset: int, chunks: AsyncIterator[bytes]) -> int:
+        session = await self.get(id, owner)
+        lease = self._lease_deadline()
+        leased = await self.collection.find_one_and_update(
+            {
+                "_id": id,
+                "offset": offset,
+                "finalizing": {"$ne": True},
+                "$or": [{"locked_until": None}, {"locked_until": {"$lte": datetime.utcnow()}}],
+            },
+            {"$set": {"locked_until": lease}},
+        )
+        if leased is None:
+            raise HTTPException(
+                status_code=409,
+                detail="Offset mismatch or upload in progress",
+                headers={"Upload-Offset": str(session["offset"])},
+            )
+
+        written = 0
+        renew_at = time.monotonic() + UPLOAD_SESSION_LEASE / 3
+        handle = await asyncio.to_thread(open, self._part_path(id), "r+b")
+        try:
+            # Anything past the recorded offset is from an interrupted request
+            await asyncio.to_thread(handle.seek, offset)
+            await asyncio.to_thread(handle.truncate)
+            async for chunk in chunks:
+                if offset + written + len(chunk) > session["size"]:
+                    raise HTTPException(status_code=413, detail="Chunk goes past the declared upload size")
+                if time.monotonic() >= renew_at:
+                    lease = await self._renew(id, lease)
+                    if lease is None:
+                        raise HTTPException(status_code=409, detail="Upload lease expired; resume from the current offset")
+                    renew_at = time.monotonic() + UPLOAD_SESSION_LEASE / 3
+                await asyncio.to_thread(handle.write, chunk)
+                written += len(chunk)
+        finally:
+            await asyncio.to_thread(handle.close)
+            # Keep whatever arrived intact, even if the client went away, but
+            # only while the file is still ours
+            if lease is not None:
+                result = await self.collection.update_one(
+                    {"_id": id, "locked_until": lease},
+                    {"$set": {"offset": offset + written, "locked_until": None, "expires_at": self._expiry()}},
+                )
+                if not result.matched_count:
+                    logger.warning("Upload %s lost its lease while writing", id)
+        return offset + written
+
+    # Hash a fully uploaded session into a temp file in `directory`, hand it
+    # to `commit` (e.g. blob_store.commit) and drop the session once that
+    # succeeded. On failure the session is released so completion can be
+    # retried; one that crashed mid-way is retried once its lease runs out.
+    async def complete(self, id: str, owner: str, directory: str, commit: Callable[[StoredFile], Awaitable[str]]) -> StoredFile:
+        session = await self.get(id, owner)
+        if session["offset"] != session["size"]:
+            raise HTTPException(
+                status_code=409,
+                detail="Upload is not complete",
+                headers={"Upload-Offset": str(session["offset"])},
+            )
+        lease = self._lease_deadline()
+        claimed = await self.collection.find_one_and_update(
+            {
+                "_id": id,
+                "offset": session["size"],
+                "$or": [{"locked_until": None}, {"locked_until": {"$lte": datetime.utcnow()}}],
+            },
+            {"$set": {"finalizing": True, "locked_until": lease, "expires_at": self._expiry()}},
+        )
+        if claimed is None:
+            raise HTTPException(status_code=409, detail="Upload in progress")
+
+        part_path = self._part_path(id)
+        temp_path = os.path.join(directory, f".{uuid.uuid4().hex}.part")
+        try:
+            started = time.perf_counter()
+            digest = await asyncio.to_thread(_hash_file, part_path)
+            await asyncio.to_thread(os.replace, part_path, temp_path)
+            stored = StoredFile(session["filename"], temp_path, session["size"], time.perf_counter() - started, digest)
+            stored.path = await commit(stored)
+        except BaseException:
+            # Put the bytes back where the session expects them
+            if await asyncio.to_thread(os.path.exists, temp_path):
+                await asyncio.to_thread(os.replace, temp_path, part_path)
+            await self.collection.update_one(
+                {"_id": id, "locked_until": lease},
+                {"$set": {"finalizing": False, "locked_until": None}},
+            )
+            raise
+        await self.collection.delete_one({"_id": id})
+        return stored
+
+    async def abort(self, id: str, owner: str):
+        await self.get(id, owner)
+        await self.collection.delete_one({"_id": id})
+        await asyncio.to_thread(remove_quietly, self._part_path(id))
+
+    # Remove expired sessions and their partial files
+    async def sweep(self) -> int:
+        swept = 0
+        async for session in self.collection.find({"expires_at": {"$lte": datetime.utcnow()}}, {"_id": 1}):
+            deleted = await self.collection.delete_one({"_id": session["_id"]})
+            if deleted.deleted_count:
+                await asyncio.to_thread(remove_quietly, self._part_path(session["_id"]))
+                swept += 1
+        if swept:
+            logger.info("Swept %d expired upload sessions", swept)
+        return swept
+
+    # Background task started from the application lifespan
+    async def run_sweeper(self, interval: int = UPLOAD_SESSION_SWEEP_INTERVAL):
+        while True:
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("Upload session sweep failed")
+            await asyncio.sleep(interval)
+
+
+def _create_empty(path: str):
+    with open(path, "wb"):
+        pass
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+resumable_uploads = ResumableUploads()
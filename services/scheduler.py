@@ -0,0 +1,189 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+from bson import ObjectId
+from database import assignment_collection, subscription_collection
+from services.leases import Lease
+from services.notifications import notification_hub
+
+logger = logging.getLogger(__name__)
+
+# Scheduler configuration
+REMINDER_LEAD = int(os.getenv("REMINDER_LEAD", str(24 * 3600)))  # seconds before the due date
+SCHEDULER_HORIZON = int(os.getenv("SCHEDULER_HORIZON", str(6 * 3600)))  # how far ahead the heap is hydrated
+SCHEDULER_REFRESH = int(os.getenv("SCHEDULER_REFRESH", "60"))  # seconds between rehydrations
+SCHEDULER_LEASE_TTL = int(os.getenv("SCHEDULER_LEASE_TTL", "30"))
+
+REMINDER = "reminder"
+EXPIRY = "expiry"
+
+
+# Deadline scheduler: an in-memory heap of upcoming jobs (assignment
+# reminders, subscription expiries) ordered by run time. The heap holds
+# only the next SCHEDULER_HORIZON, hydrated from indexed range queries and
+# topped up by the write paths, so nothing ever scans a collection.
+#
+# Only the worker holding the "scheduler" lease runs jobs. Writes handled
+# by other workers reach it on its next rehydration (SCHEDULER_REFRESH),
+# and every job is a conditional update, so a job can never run twice.
+class DeadlineScheduler:
+    def __init__(self, assignments=assignment_collection, subscriptions=subscription_collection):
+        self.assignments = assignments
+        self.subscriptions = subscriptions
+        self.lease = Lease("scheduler", SCHEDULER_LEASE_TTL)
+        self._heap = []
+        self._scheduled = {}  # (kind, id) -> run time of the live heap entry
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self.horizon_end = None
+
+        # Metrics
+        self.reminders_sent = 0
+        self.subscriptions_expired = 0
+        self.hydrations = 0
+        self.is_leader = False
+
+    # Add, move or drop (when=None) one job. Superseded heap entries are
+    # left in place and skipped when they surface. Workers that do not hold
+    # the lease keep no jobs: the leader picks their writes up on rehydration.
+    def schedule(self, kind: str, id: str, when: Optional[datetime]):
+        if not self.is_leader or self.horizon_end is None:
+            return
+        key = (kind, str(id))
+        if when is None or when > self.horizon_end:
+            self._scheduled.pop(key, None)
+            return
+        if self._scheduled.get(key) == when:
+            return
+        self._scheduled[key] = when
+        heapq.heappush(self._heap, (when, next(self._counter), kind, str(id)))
+        if self._heap[0][0] == when:
+            self._wakeup.set()
+
+    # Called by the assignment write paths
+    def schedule_assignment(self, assignment: dict):
+        due_date = assignment.get("due_date")
+        if assignment.get("reminder_sent_at") is not None or due_date is None:
+            self.schedule(REMINDER, assignment["_id"], None)
+        else:
+            self.schedule(REMINDER, assignment["_id"], due_date - timedelta(seconds=REMINDER_LEAD))
+
+    # Called by the subscription write paths
+    def schedule_subscription(self, subscription: dict):
+        when = subscription["end_date"] if subscription.get("status") == "active" else None
+        self.schedule(EXPIRY, subscription["_id"], when)
+
+    # Reload every job due before the new horizon
+    async def hydrate(self):
+        now = datetime.utcnow()
+        horizon_end = now + timedelta(seconds=SCHEDULER_HORIZON)
+        self._heap, self._scheduled, self.horizon_end = [], {}, horizon_end
+
+        reminders = self.assignments.find(
+            {"due_date": {"$gt": now, "$lte": horizon_end + timedelta(seconds=REMINDER_LEAD)}, "reminder_sent_at": None},
+            {"due_date": 1, "reminder_sent_at": 1},
+        )
+        async for assignment in reminders:
+            self.schedule_assignment(assignment)
+
+        expiries = self.subscriptions.find(
+            {"status": "active", "end_date": {"$lte": horizon_end}},
+            {"end_date": 1, "status": 1},
+        )
+        async for subscription in expiries:
+            self.schedule_subscription(subscription)
+        self.hydrations += 1
+
+    async def _send_reminder(self, id: str):
+        now = datetime.utcnow()
+        assignment = await self.assignments.find_one_and_update(
+            {"_id": ObjectId(id), "reminder_sent_at": None, "due_date": {"$lte": now + timedelta(seconds=REMINDER_LEAD)}},
+            {"$set": {"reminder_sent_at": now}},
+        )
+        if assignment is None:
+            return
+        # Past-due assignments (e.g. after downtime) get no reminder
+        if assignment["due_date"] > now:
+            notification_hub.publish(
+                [assignment["created_by"]],
+                f"\"{assignment['title']}\" is due at {assignment['due_date'].isoformat()}",
+                event="assignment.due",
+                assignment_id=id,
+            )
+            self.reminders_sent += 1
+
+    async def _expire_subscription(self, id: str):
+        subscription = await self.subscriptions.find_one_and_update(
+            {"_id": ObjectId(id), "status": "active", "end_date": {"$lte": datetime.utcnow()}},
+            {"$set": {"status": "expired"}},
+        )
+        if subscription is None:
+            return
+        notification_hub.publish([subscription["user_id"]], f"Your {subscription['plan']} subscription has expired", event="subscription.expired")
+        self.subscriptions_expired += 1
+
+    # Run every job whose time has come; returns when the next one is due
+    async def run_due(self) -> Optional[datetime]:
+        now = datetime.utcnow()
+        while self._heap and self._heap[0][0] <= now:
+            when, _, kind, id = heapq.heappop(self._heap)
+            if self._scheduled.get((kind, id)) != when:
+                continue
+            del self._scheduled[(kind, id)]
+            try:
+                if kind == REMINDER:
+                    await self._send_reminder(id)
+                else:
+                    await self._expire_subscription(id)
+            except Exception:
+                logger.exception("Scheduled %s for %s failed", kind, id)
+        return self._heap[0][0] if self._heap else None
+
+    async def run(self):
+        next_refresh = datetime.min
+        while True:
+            try:
+                was_leader, self.is_leader = self.is_leader, await self.lease.acquire()
+                if was_leader and not self.is_leader:
+                    # Another worker took over; drop our copy of the jobs
+                    self._heap, self._scheduled, self.horizon_end = [], {}, None
+                    next_refresh = datetime.min
+                if self.is_leader and datetime.utcnow() >= next_refresh:
+                    await self.hydrate()
+                    next_refresh = datetime.utcnow() + timedelta(seconds=SCHEDULER_REFRESH)
+                next_run = await self.run_due() if self.is_leader else None
+            except Exception:
+                logger.exception("Scheduler iteration failed")
+                next_run = None
+
+            # Sleep until the next job, a rehydration or a lease renewal,
+            # whichever is first; an earlier job scheduled meanwhile wakes us
+            timeout = min(SCHEDULER_REFRESH, SCHEDULER_LEASE_TTL / 3)
+            if next_run is not None:
+                timeout = min(timeout, max((next_run - datetime.utcnow()).total_seconds(), 0))
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def shutdown(self):
+        if self.is_leader:
+            await self.lease.release()
+
+    def metrics(self) -> dict:
+        return {
+            "leader": self.is_leader,
+            "scheduled": len(self._scheduled),
+            "next_run": self._heap[0][0] if self._heap else None,
+            "reminders_sent": self.reminders_sent,
+            "subscriptions_expired": self.subscriptions_expired,
+            "hydrations": self.hydrations,
+        }
+
+
+deadline_scheduler = DeadlineScheduler()
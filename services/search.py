@@ -0,0 +1,56 @@
+from typing import Callable, List, Optional, Tuple
+from services.pagination import decode_cursor_state, encode_cursor
+
+# Fields facet counts are returned for
+FACET_FIELDS = ["subject", "status"]
+
+
+# Ranked full-text search over a collection with a text index. Pages are
+# keyed on (score, _id) with the same opaque cursor as the list endpoints;
+# facet counts cover every match and are only computed when asked for.
+async def text_search(
+    collection,
+    q: str,
+    query: dict,
+    fields: List[str],
+    limit: int,
+    cursor: Optional[str],
+    helper: Callable[[dict], dict],
+    with_facets: bool = False,
+) -> Tuple[List[dict], Optional[str], Optional[dict]]:
+    results = []
+    if cursor:
+        state = decode_cursor_state(cursor)
+        results.append({"$match": {"$or": [
+            {"score": {"$lt": state["score"]}},
+            {"score": state["score"], "_id": {"$lt": state["id"]}},
+        ]}})
+    results += [
+        {"$sort": {"score": -1, "_id": -1}},
+        {"$limit": limit + 1},
+        {"$project": {**{field: 1 for field in fields}, "score": 1}},
+    ]
+
+    pipeline = [
+        {"$match": {"$text": {"$search": q}, **query}},
+        {"$addFields": {"score": {"$meta": "textScore"}}},
+    ]
+    if with_facets:
+        facets = {
+            field: [{"$group": {"_id": f"${field}", "count": {"$sum": 1}}}, {"$sort": {"count": -1}}]
+            for field in FACET_FIELDS
+        }
+        pipeline.append({"$facet": {"results": results, **facets}})
+        output = (await collection.aggregate(pipeline).to_list(1))[0]
+        documents = output.pop("results")
+        facet_counts = {field: {str(bucket["_id"]): bucket["count"] for bucket in output[field]} for field in FACET_FIELDS}
+    else:
+        documents = await collection.aggregate(pipeline + results).to_list(limit + 1)
+        facet_counts = None
+
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        last = documents[-1]
+        next_cursor = encode_cursor(last["_id"], score=last["score"])
+    return [helper(document) for document in documents], next_cursor, facet_counts
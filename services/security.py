@@ -0,0 +1,42 @@
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+# JWT configuration
+SECRET_KEY = os.getenv("SECRET_KEY", "your_secret_key")  # Make sure to set a secure secret in production
+ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))  # Token expiration (1 hour)
+
+# python-jose (and the crypto backends it probes) is imported on the first
+# sign/verify rather than when a worker boots
+_jwt = None
+_JWTError = None
+
+
+# Raised for a token that is malformed, tampered with or expired
+class InvalidTokenError(Exception):
+    pass
+
+
+def _get_jwt():
+    global _jwt, _JWTError
+    if _jwt is None:
+        from jose import JWTError, jwt
+        _jwt, _JWTError = jwt, JWTError
+    return _jwt
+
+
+# Sign claims into an access token that expires after expires_delta
+def encode_token(claims: dict, expires_delta: Optional[timedelta] = None) -> str:
+    to_encode = dict(claims)
+    to_encode["exp"] = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    return _get_jwt().encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+
+# Verify the signature and expiry of a token and return its claims
+def verify_token(token: str) -> dict:
+    jwt = _get_jwt()
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except _JWTError as e:
+        raise InvalidTokenError(str(e)) from e
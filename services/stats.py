@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import os
+import sys
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Dict, Iterable, List, Optional, Tuple
+from pymongo import UpdateOne, DeleteOne
+from database import assignment_collection, solution_collection, run_with_client, stat_collection, user_collection
+from services.leases import Lease
+
+logger = logging.getLogger(__name__)
+
+# How often one worker corrects counter drift from the source collections
+STATS_RECONCILE_INTERVAL = int(os.getenv("STATS_RECONCILE_INTERVAL", "3600"))
+# A user is active if they logged in within this many days
+STATS_ACTIVE_DAYS = int(os.getenv("STATS_ACTIVE_DAYS", "30"))
+
+DAY_FORMAT = "%Y-%m-%d"
+
+
+def day(when: Optional[datetime]) -> Optional[str]:
+    return when.strftime(DAY_FORMAT) if when else None
+
+
+def _value(value):
+    return value.value if isinstance(value, Enum) else value
+
+
+# Counter keys (group, value) each document contributes to. Per-day groups
+# are the time-bucketed series; their values sort in date order.
+COUNTERS = {
+    "assignments": lambda assignment: [
+        ("assignments.status", _value(assignment.get("status"))),
+        ("assignments.subject", assignment.get("subject")),
+        ("assignments.per_day", day(assignment.get("created_at"))),
+    ],
+    "solutions": lambda solution: [
+        ("solutions.per_day", day(solution.get("submitted_on"))),
+    ],
+    "users": lambda user: [
+        ("users.role", _value(user.get("role"))),
+    ],
+}
+
+# The same keys computed by the database, for reconciliation
+_DAY = lambda field: {"$dateToString": {"format": DAY_FORMAT, "date": f"${field}"}}
+PIPELINE_KEYS = {
+    "assignments": [
+        {"group": "assignments.status", "value": "$status"},
+        {"group": "assignments.subject", "value": "$subject"},
+        {"group": "assignments.per_day", "value": _DAY("created_at")},
+    ],
+    "solutions": [{"group": "solutions.per_day", "value": _DAY("submitted_on")}],
+    "users": [{"group": "users.role", "value": "$role"}],
+}
+
+
+def counter_id(group: str, value) -> str:
+    return f"{group}:{value}"
+
+
+# Dashboard counters: one small document per (group, value) bumped with $inc
+# by the write handlers, so reading the dashboard never scans a collection.
+class Stats:
+    def __init__(self, collection=stat_collection):
+        self.collection = collection
+        self.lease = Lease("stats-reconcile", STATS_RECONCILE_INTERVAL)
+        self.last_reconciled = None
+        self.last_drift = None
+
+    # Apply the counter changes of created (added) and deleted (removed)
+    # documents of one kind in a single bulk write; an update is both
+    async def record(self, kind: str, added: Iterable[dict] = (), removed: Iterable[dict] = ()):
+        deltas = {}
+        for documents, sign in ((added, 1), (removed, -1)):
+            for document in documents:
+                for key in COUNTERS[kind](document):
+                    if key[1] is not None:
+                        deltas[key] = deltas.get(key, 0) + sign
+        operations = [
+            UpdateOne(
+                {"_id": counter_id(group, value)},
+                {"$inc": {"count": delta}, "$set": {"group": group, "value": value}},
+                upsert=True,
+            )
+            for (group, value), delta in deltas.items() if delta
+        ]
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+
+    async def counts(self, group: str, since: Optional[str] = None) -> Dict[str, int]:
+        query = {"group": group, "count": {"$gt": 0}}
+        if since is not None:
+            query["value"] = {"$gte": since}
+        return {counter["value"]: counter["count"] async for counter in self.collection.find(query).sort("value", 1)}
+
+    # Note a successful login on the user document, at most once a day so
+    # repeated logins cost no extra write
+    async def record_login(self, user: dict):
+        now = datetime.utcnow()
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        last_login = user.get("last_login_at")
+        if last_login is None or last_login < today:
+            await user_collection.update_one(
+                {"_id": user["_id"], "$or": [{"last_login_at": None}, {"last_login_at": {"$lt": today}}]},
+                {"$set": {"last_login_at": now}},
+            )
+
+    # Users who logged in within the last `days` days, per role. Not a
+    # counter: users leave the window without any write, so this is one
+    # aggregation over the last_login_at_role index, touching active users only.
+    async def active_by_role(self, days: int = STATS_ACTIVE_DAYS) -> Dict[str, int]:
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        pipeline = [
+            {"$match": {"last_login_at": {"$gte": cutoff}}},
+            {"$group": {"_id": "$role", "count": {"$sum": 1}}},
+            {"$sort": {"_id": 1}},
+        ]
+        return {row["_id"]: row["count"] async for row in user_collection.aggregate(pipeline) if row["_id"] is not None}
+
+    async def dashboard(self, days: int) -> dict:
+        since = day(datetime.utcnow() - timedelta(days=days - 1))
+        return {
+            "assignments": {
+                "by_status": await self.counts("assignments.status"),
+                "by_subject": await self.counts("assignments.subject"),
+                "per_day": await self.counts("assignments.per_day", since),
+            },
+            "solutions": {"per_day": await self.counts("solutions.per_day", since)},
+            "users": {
+                "by_role": await self.counts("users.role"),
+                "active_by_role": await self.active_by_role(),
+                "active_days": STATS_ACTIVE_DAYS,
+            },
+        }
+
+    # Every counter recomputed by one pipeline over all three collections
+    async def expected(self) -> Dict[Tuple[str, str], int]:
+        def rows(kind):
+            return [{"$project": {"_id": 0, "key": PIPELINE_KEYS[kind]}}, {"$unwind": "$key"}]
+
+        pipeline = rows("assignments") + [
+            {"$unionWith": {"coll": solution_collection.name, "pipeline": rows("solutions")}},
+            {"$unionWith": {"coll": user_collection.name, "pipeline": rows("users")}},
+            {"$match": {"key.value": {"$ne": None}}},
+            {"$group": {"_id": "$key", "count": {"$sum": 1}}},
+        ]
+        return {
+            (row["_id"]["group"], row["_id"]["value"]): row["count"]
+            async for row in assignment_collection.aggregate(pipeline)
+        }
+
+    # Correct drift between the counters and the data; returns the ids fixed.
+    # Writes racing with this may be off by one until the next run.
+    async def reconcile(self, dry_run: bool = False) -> List[str]:
+        expected = {counter_id(group, value): (group, value, count) for (group, value), count in (await self.expected()).items()}
+        stored = {counter["_id"]: counter.get("count", 0) async for counter in self.collection.find({}, {"count": 1})}
+
+        operations, drifted = [], []
+        for id, (group, value, count) in expected.items():
+            if stored.get(id) != count:
+                operations.append(UpdateOne({"_id": id}, {"$set": {"group": group, "value": value, "count": count}}, upsert=True))
+                drifted.append(id)
+        for id, count in stored.items():
+            if id not in expected:
+                operations.append(DeleteOne({"_id": id}))
+                if count:
+                    drifted.append(id)
+
+        drifted.sort()
+        if operations and not dry_run:
+            await self.collection.bulk_write(operations, ordered=False)
+        if drifted:
+            logger.info("Stats counters drifted: %s", drifted)
+        self.last_reconciled = datetime.utcnow()
+        self.last_drift = len(drifted)
+        return drifted
+
+    # Periodic reconciliation on whichever worker holds the lease
+    async def run_reconciler(self, interval: int = STATS_RECONCILE_INTERVAL):
+        while True:
+            try:
+                if await self.lease.acquire():
+                    await self.reconcile()
+            except Exception:
+                logger.exception("Stats reconciliation failed")
+            await asyncio.sleep(interval)
+
+    def metrics(self) -> dict:
+        return {"last_reconciled": self.last_reconciled, "last_drift": self.last_drift}
+
+
+stats = Stats()
+
+
+# python -m services.stats [--apply]  (lists drifted counters; dry run by default)
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    drifted = run_with_client(stats.reconcile, dry_run="--apply" not in sys.argv)
+    print(f"{len(drifted)} counter(s) drifted")
+    for id in drifted:
+        print(id)
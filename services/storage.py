@@ -0,0 +1,136 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+import uuid
+from typing import List
+from fastapi import UploadFile
+
+logger = logging.getLogger(__name__)
+
+# Upload limits (bytes)
+MAX_UPLOAD_FILE_SIZE = int(os.getenv("MAX_UPLOAD_FILE_SIZE", str(100 * 1024 * 1024)))
+MAX_UPLOAD_REQUEST_SIZE = int(os.getenv("MAX_UPLOAD_REQUEST_SIZE", str(250 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+
+# Raised while streaming when a file or the whole request is over its limit
+class UploadTooLargeError(Exception):
+    pass
+
+
+# Result of writing one uploaded file
+class StoredFile:
+    def __init__(self, filename: str, path: str, size: int, seconds: float, digest: str = None):
+        self.filename = filename
+        self.path = path
+        self.size = size
+        self.seconds = seconds
+        self.digest = digest  # sha256 of the content, computed while streaming
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.size / self.seconds if self.seconds > 0 else float(self.size)
+
+
+# Streams uploads to disk off the event loop, with size limits, into temp
+# files that the blob store renames into place (see services/blob_store.py)
+# so readers never see a partially written file.
+class UploadStorage:
+    def __init__(
+        self,
+        max_file_size: int = MAX_UPLOAD_FILE_SIZE,
+        max_request_size: int = MAX_UPLOAD_REQUEST_SIZE,
+        chunk_size: int = UPLOAD_CHUNK_SIZE,
+    ):
+        self.max_file_size = max_file_size
+        self.max_request_size = max_request_size
+        self.chunk_size = chunk_size
+
+        # Metrics
+        self.files_written = 0
+        self.bytes_written = 0
+        self.rejected = 0
+        self.write_seconds = 0.0
+        self.last_bytes_per_second = 0.0
+
+    async def _stream_to_temp(self, file: UploadFile, directory: str, budget: dict) -> StoredFile:
+        temp_path = os.path.join(directory, f".{uuid.uuid4().hex}.part")
+        size = 0
+        digest = hashlib.sha256()
+        started = time.perf_counter()
+        handle = await asyncio.to_thread(open, temp_path, "wb")
+        try:
+            while True:
+                chunk = await file.read(self.chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                budget["used"] += len(chunk)
+                if size > self.max_file_size:
+                    raise UploadTooLargeError(f"File '{file.filename}' exceeds {self.max_file_size} bytes")
+                if budget["used"] > self.max_request_size:
+                    raise UploadTooLargeError(f"Upload exceeds {self.max_request_size} bytes per request")
+                await asyncio.to_thread(_write_chunk, handle, digest, chunk)
+        except BaseException:
+            await asyncio.to_thread(handle.close)
+            await asyncio.to_thread(remove_quietly, temp_path)
+            raise
+        await asyncio.to_thread(handle.close)
+        return StoredFile(file.filename, temp_path, size, time.perf_counter() - started, digest.hexdigest())
+
+    # Stream all files of one request concurrently into temp files in
+    # `directory`; the caller moves them into place. Input order is kept.
+    async def stream(self, files: List[UploadFile], directory: str) -> List[StoredFile]:
+        budget = {"used": 0}
+        tasks = [asyncio.ensure_future(self._stream_to_temp(file, directory, budget)) for file in files]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # Stop the other writers and drop whatever they already wrote
+            for task in tasks:
+                task.cancel()
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            for result in results:
+                if isinstance(result, StoredFile):
+                    await asyncio.to_thread(remove_quietly, result.path)
+            self.rejected += 1
+            raise
+        return [task.result() for task in tasks]
+
+    def record(self, stored: StoredFile) -> StoredFile:
+        self.files_written += 1
+        self.bytes_written += stored.size
+        self.write_seconds += stored.seconds
+        self.last_bytes_per_second = stored.bytes_per_second
+        logger.info(
+            "Stored upload %s (%d bytes in %.3fs, %.0f bytes/s)",
+            stored.path, stored.size, stored.seconds, stored.bytes_per_second,
+        )
+        return stored
+
+    def metrics(self) -> dict:
+        return {
+            "files_written": self.files_written,
+            "bytes_written": self.bytes_written,
+            "rejected_requests": self.rejected,
+            "avg_bytes_per_second": round(self.bytes_written / self.write_seconds, 1) if self.write_seconds else 0.0,
+            "last_bytes_per_second": round(self.last_bytes_per_second, 1),
+        }
+
+
+def _write_chunk(handle, digest, chunk: bytes):
+    digest.update(chunk)
+    handle.write(chunk)
+
+
+def remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+# Single instance shared by the assignment and solution routes
+upload_storage = UploadStorage()
@@ -3,5 +3,7 @@
 # Activate virtual environment (if necessary)
 # source .venv/bin/activate
 
-# Start the FastAPI application
-uvicorn main:app --host 0.0.0.0 --port 8000
+# Start the FastAPI application: one worker per available CPU
+# (override with WEB_CONCURRENCY). For local development use
+#   uvicorn main:app --reload
+exec python serve.py --host 0.0.0.0 --port 8000